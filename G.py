@@ -18,60 +18,111 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
-import os, sys, threading
+import os, subprocess, sys
 
-from cli_colors import fg
-from config import history_file
+# Only the modules which are needed by every command are imported here, all other
+# modules are imported by the operators which need them (see main() and get_args())
+from command import expand_manifests, parse
 from helpers import *
-from messages import usage
-from remotes import add_remote, show_remotes
-from settings import get_settings
-from submodules import add_submodule, find_submodules, show_submodules, update_submodules
+from messages import failed, usage, warning
 
-def main( args ):
+# The interactive console, see get_args()
+console = None
 
-    settings = get_settings()
-    operands = get_operands( args )
+def main( args ):
+    """Execute a command, returns False when the command is unknown or has failed"""
 
     if not args:
         usage()
+    elif args[0] == "@all":
+        # Run the command in all registered repositories
+        from fanout import fanout
+        results = fanout( args[1:] )
+        # None: The command was refused
+        if results is None or failed( results ):
+            return False
+    elif args[0] == "@branches":
+        # "@branches", "@branches stale" or "@branches merged"
+        from branches import show_branches
+        if show_branches( args[1:] ) is None:
+            return False
+    elif args[0] in ( "@index", "status" ) and args[1:] == [ "--watch" ]:
+        from watch import watch_status
+        watch_status()
+    elif args[0] == "update":
+        # "update --force" pulls also the submodules, whose remotes have not changed
+        from submodules import update_submodules
+        if failed( update_submodules( force = "--force" in args[1:] ) ):
+            return False
     elif len( args ) == 1:
         if args[0] == "@remotes":
+            from remotes import show_remotes
             show_remotes()
         elif args[0] == "@submodules":
+            from submodules import show_submodules
             show_submodules()
-        elif args[0] == "update":
-            update_submodules()
+        elif args[0] == "@reindex":
+            from submodules import reindex
+            reindex()
         elif args[0] == "usage" or args[0] == "help":
             usage()
         elif args[0] == "@index" or args[0] == "status":
-            git( "status", "--short" )
-        elif args[0] == "@branches":
-            git( "branch" )
+            from status import show_status
+            show_status()
+        else:
+            return False
     else:
-        for operator, parameter in operands.items():
-            if not is_empty( parameter ):
-                if operator == "add" or operator == "reset":
-                    git( operator, parameter )
-                    git( "status" )
-                elif operator == "push":
-                    if len( parameter ) == 1:
-                        git( "push", [ "origin", parameter[0][1:] ] )
-                    elif len( parameter ) == 2:
-                        git( "push", [ parameter[1][1:], parameter[0][1:] ] )
-                elif operator == "merge":
-                    if len( parameter ) == 1:
-                        git( "merge", parameter[0][1:] )
-                    elif len( parameter ) == 2:
-                        git( "checkout",  [ parameter[0][1:] ]  )
-                        git( "merge", parameter[1][1:] )
-                elif operator == "cd":
-                    os.chdir( os.path.expanduser( parameter[0] ) )
-                elif operator == "set":
-                    if is_submodule( parameter[0] ):
-                        add_submodule( parameter[0][1:], parameter[1] )
-                elif operator == "diff":
-                    git( "diff", parameter )
+        try:
+            plan = parse( args )
+        except ValueError as exception:
+            warning( str( exception ) )
+            return False
+        operator, parameter = plan.operator, plan.arguments
+        if operator and not is_empty( parameter ):
+            if operator == "add" or operator == "reset":
+                from status import show_status
+                paths = expand_manifests( parameter )
+                git( operator, paths )
+                # Only show the paths which were added or reset
+                show_status( paths )
+            elif operator == "push":
+                # The branch is in front of "->", the remotes are after it
+                branch = plan.operands[0][1:]
+                remotes = [ remote[1:] for remote in plan.targets ] or [ "origin" ]
+                if len( remotes ) == 1:
+                    git( "push", [ remotes[0], branch ] )
+                else:
+                    from remotes import push_remotes
+                    if failed( push_remotes( branch, remotes ) ):
+                        return False
+            elif operator == "merge":
+                from coprocess import resolve
+                # Look up the branches via the cat-file coprocess, before the working
+                # tree is touched by a checkout
+                unknown = [ branch for branch in parameter if not resolve( branch[1:] ) ]
+                if unknown:
+                    warning( "Unknown branch: " + ", ".join( unknown ) )
+                    return False
+                elif len( parameter ) == 1:
+                    git( "merge", parameter[0][1:] )
+                elif len( parameter ) == 2 and git_version() >= ( 2, 38 ):
+                    from merge import merge_branches
+                    return merge_branches( parameter[0][1:], parameter[1][1:] )
+                elif len( parameter ) == 2:
+                    # "git merge-tree --write-tree" is not available in older versions of git
+                    git( "checkout",  [ parameter[0][1:] ]  )
+                    git( "merge", parameter[1][1:] )
+            elif operator == "cd":
+                os.chdir( os.path.expanduser( parameter[0] ) )
+            elif operator == "set":
+                from submodules import add_submodule
+                if is_submodule( parameter[0] ):
+                    add_submodule( parameter[0][1:], parameter[1] )
+            elif operator == "diff":
+                git( "diff", parameter )
+        else:
+            # Neither a known command nor an operator with arguments
+            return False
 
 def get_args( args = sys.argv ):
     """Returns the arguments in an list which are typed-in by the user
@@ -84,98 +135,21 @@ def get_args( args = sys.argv ):
     """
 
     if len( args ) == 1:
-        console = GConsole()
-        # Decorate the user prompt: When the current directory is a
-        # repository the prompt is also decorated with the branches name
-        if is_repository():
-            prompt = "G:" + fg.blue( get_current_branch() ) + " " + fg.red( ">" ) + " "
-        else:
-            prompt = "G " + fg.red( ">" ) + " "
+        from console import GConsole
+        from prompt import get_prompt
+        # The console (and the history) is only created once per session
+        global console
+        if not console:
+            console = GConsole()
+        # Decorate the user prompt: When the current directory is a repository the
+        # prompt is also decorated with the branches name and its state (see prompt.py)
         # Yes it's called raw_input, stupid heh?
-        return console.raw_input( prompt ).split()
+        return console.raw_input( get_prompt() ).split()
     if len( args ) == 2:
         if type( args[1] ) == str:
             return args[1].split()
     else:
-        return args
-
-def get_operator( args ):
-    """Get the operator from the Arguments
-
-    The operation which should be processed is defined by an operator. Possible operators
-    are: "+", "-", "~", "=", "→", ">"
-
-    Arguments:
-        args: The arguments that need to be processed to get the operator
-    """
-
-    if type( args ) == str:
-        args = [ args ]
-
-    for arg in args:
-        index = args.index( arg )
-        if index == 0:
-            if arg == "+":
-                return "add"
-            elif arg == "-":
-                return "reset"
-        if index >= 0:
-            if arg == "=":
-                return "set"
-            elif arg == "->":
-                return "push"
-            elif arg == ">":
-                return "merge"
-            elif arg == "cd":
-                return "cd"
-            elif arg == "diff":
-                return "diff"
-    return False
-
-def get_operands( args ):
-    """Returns all operands as an dictionary
-
-    When the current argument is a special operator (like "+", "-", ...) the arguments
-    before the operator are removed. Now the recursion begins and the function is executed again,
-    when the index is greater than 0. The index must be greater then nill, because the get_operands()
-    function would otherwise loop endless, because the first argument is at everytime an operator,
-    when used in combination with a special operator.
-
-    When the current argument is an operator like "push" or "merge" or is an file, the argument is added
-    to the operands dictionary. When the current argument is a file it would also added to the
-    arguments list. The index of a file or a branch (@master) could also be greater or equal to the
-    index 0 because normal operators does not start a recursive processing of the other arguments.
-
-    When the index of the current argument is as long as the length of the arguments list,
-    this argument is the last argument of the arguments list and is also added to the operands list.
-    At this point the recursion stops, because all elements are added to the operands list.
-
-    Arguments:
-        args: The arguments that need to be checked for operands
-    """
-
-    # The index number of the last element in the args list
-    length = len( args ) - 1
-    operator = get_operator( args )
-
-    for arg in args:
-        # The index of the current argument (arg)
-        index = args.index( arg )
-        if index < length:
-            if index == 0:
-                operands = { "add": [], "reset": [], "merge": [], "push": [], "cd": [], "set": [], "diff": [] }
-            if index >= 0:
-                if not get_operator( arg ):
-                    operands.get( operator ).append( arg )
-            elif index > 0:
-                if arg == "+" or arg == "-" or arg == "~":
-                    del args[0:index]
-                    return get_operands( args )
-        # Return all operands when the index is equally to the length of the
-        # arguments array, the recursiomn stops at this pint (also append the
-        elif index == length and not index == 0:
-            operands.get( operator ).append( arg )
-            return operands
+        return args[1:]
 
 # Check if the program is started via the executable
 if __name__ == "__main__":
@@ -189,35 +163,76 @@ if __name__ == "__main__":
     it possible to use "G" a an python module.
     """
 
+    # Profile all git processes and other operations: "--profile" prints a latency
+    # summary and "--trace FILE" writes a Chrome trace-event file at exit
+    profile = "--profile" in sys.argv
+    trace = None
+    if "--trace" in sys.argv[:-1]:
+        trace = sys.argv[sys.argv.index( "--trace" ) + 1]
+        del sys.argv[sys.argv.index( "--trace" ):sys.argv.index( "--trace" ) + 2]
+    if profile:
+        sys.argv.remove( "--profile" )
+    if profile or trace:
+        import atexit, profiling
+        profiling.enable()
+        atexit.register( profiling.report, profile, trace )
+
+    if len( sys.argv ) > 1 and sys.argv[1] == "--daemon":
+        # Keep G resident and execute the commands of client.py
+        from daemon import serve
+        serve()
+        sys.exit( 0 )
+    if len( sys.argv ) > 1 and ( sys.argv[1] == "--batch" or sys.argv[1:] in ( [ "-" ], [ "-", "--keep-going" ] ) ):
+        # Batch mode: Execute the commands from a file ("--batch FILE") or from stdin ("-")
+        # in one process, "--keep-going" does not stop at the first failed command
+        from batch import read_commands, run_batch
+        keep_going = "--keep-going" in sys.argv
+        args = [ arg for arg in sys.argv[1:] if arg != "--keep-going" ]
+        if args[0] == "--batch" and len( args ) != 2:
+            usage()
+            sys.exit( 2 )
+        sys.exit( run_batch( read_commands( args[-1] ), main, keep_going ) )
+    # One-shot mode: Execute a single command and exit, no background threads
+    # are started and readline is not loaded
+    if len( sys.argv ) > 1:
+        # Start G in debug mode (errors become printed to stderr)
+        debug = sys.argv[1] == "-d" or sys.argv[1] == "--debug"
+        if debug:
+            # Remove the debug parameter from the arguments
+            del sys.argv[1]
+        try:
+            result = main( args = get_args() )
+        except subprocess.CalledProcessError as exception:
+            if debug:
+                raise
+            sys.exit( exception.returncode )
+        sys.exit( 1 if result is False else 0 )
+
+    import threading
+    from history import get_history
+    from submodules import find_submodules
+
     # Start some processes in the background:
     # The daemon parameter is necessary to not raise failure messages
     # when exiting via <C-d> or <C-c>
 
-    # Check if the history is longer than "history-length"
-    threading.Thread( target = history_file, daemon = True ).start()
+    # Compact the history file when it is much longer than "history-length"
+    threading.Thread( target = lambda: get_history().compact(), daemon = True ).start()
     # Execute find_submodules in the background
     threading.Thread( target = find_submodules, daemon = True ).start()
 
     while True:
-        # Parse optional arguments
-        if len( sys.argv ) > 1:
-            # Start G in debug mode (main is executed one single time,
-            # errors become printed to stderr)
-            if sys.argv[1] == "-d" or sys.argv[1] == "--debug":
-                # Remove the debug parameter from the arguments
-                del sys.argv[1]
-                main( args = sys.argv )
-        else:
-            try:
-                main( args = get_args() )
-            # Ignore attribute errors
-            except AttributeError:
-                pass
-            # Quit G via <C-c> or <C-d>
-            except BaseException:
-                sys.exit( 0 )
+        try:
+            main( args = get_args() )
+        # Ignore attribute errors
+        except AttributeError:
+            pass
+        # Quit G via <C-c> or <C-d>
+        except BaseException:
+            sys.exit( 0 )
 
 # When the user starts G as a script (for example: importing G as a module),
 # get settings from the config file (instead of get the settings via a user input
 else:
+    from settings import get_settings
     settings = get_settings()
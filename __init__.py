@@ -0,0 +1,4 @@
+# G.py runs the modules as top-level modules (i.e. "from command import parse"). When G is
+# imported as a package (i.e. "from G import api"), the modules which the API reaches import
+# each other relative to the package ("if __package__:"), so no generic module names like
+# "settings" or "config" are added to the import path of the host program.
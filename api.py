@@ -0,0 +1,255 @@
+#!/bin/env python3
+# API
+
+# The API runs G's commands for other programs: Nothing is printed and sys.exit() is never
+# called, every function returns a Result tuple instead. The coroutines (i.e. run_async()) can
+# run many commands concurrently in one event loop, the functions without the "_async" suffix
+# run a single command in a new event loop.
+#
+#   from G import api
+#   result = api.run( "+ file1 file2", cwd = "~/repository" )
+#   if result.returncode == 0:
+#       for entry in result.records:
+#           print( entry.xy, entry.path )
+
+import asyncio, errno, io, os, subprocess
+
+from collections import namedtuple
+
+if __package__:
+    from . import branches as branches_module, gitconfig, status as status_module
+    from .command import expand_manifests, parse
+    from .helpers import PATHSPEC_COMMANDS, PATHSPEC_THRESHOLD, argv_budget, chunk_end, git_version
+    from .repository import find_repository
+else:
+    import branches as branches_module, gitconfig, status as status_module
+    from command import expand_manifests, parse
+    from helpers import PATHSPEC_COMMANDS, PATHSPEC_THRESHOLD, argv_budget, chunk_end, git_version
+    from repository import find_repository
+
+# args: The arguments of the git process (of the command, when a manifest file could not be read)
+# returncode: The exit code, None when the process was stopped after the timeout
+# stdout, stderr: The captured output as strings
+Process = namedtuple( "Process", [ "args", "returncode", "stdout", "stderr" ] )
+
+# plan: The parsed command (see command.Plan), None for the commands without an operator
+# returncode: 0 when the command succeeded, the exit code of the first failed git process otherwise
+# processes: A list of Process tuples of all git processes, which were started by the command
+# records: The parsed result of the command (a list of status.Entry, branches.Branch or Remote
+# tuples, or a merge.Merge tuple), None when the command has no parsed result
+Result = namedtuple( "Result", [ "plan", "returncode", "processes", "records" ] )
+
+Remote = namedtuple( "Remote", [ "name", "url" ] )
+
+def returncode( processes ):
+    """Returns the exit code of the first failed process, 0 when all processes succeeded"""
+    for process in processes:
+        if process.returncode != 0:
+            return 1 if process.returncode is None else process.returncode
+    return 0
+
+def repository_of( cwd ):
+    repository = find_repository( cwd )
+    if not repository:
+        raise ValueError( "Not a repository: " + ( cwd or os.getcwd() ) )
+    return repository
+
+async def git_async( args, cwd = None, input = None, timeout = None ):
+    """Run a git process and capture its output, returns a Process tuple
+
+    Arguments:
+        args: The arguments of git (without "git")
+        cwd: The working directory of the process
+        input: Bytes which are written to the stdin of the process
+        timeout: The process is killed after this number of seconds
+    """
+    args = [ "git" ] + list( args ) if not args or args[0] != "git" else list( args )
+    try:
+        process = await asyncio.create_subprocess_exec( *args, cwd = cwd,
+                stdin = asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+                stdout = asyncio.subprocess.PIPE, stderr = asyncio.subprocess.PIPE )
+    except OSError as exception:
+        if exception.errno == errno.E2BIG:
+            # The caller splits the arguments (see git_paths_async())
+            raise
+        return Process( args, 127, "", str( exception ) )
+    try:
+        stdout, stderr = await asyncio.wait_for( process.communicate( input ), timeout )
+        code = process.returncode
+    except asyncio.TimeoutError:
+        process.kill()
+        stdout, stderr = await process.communicate()
+        code = None
+    # Undecodable bytes are kept as surrogates, so the output can be encoded again (see status_async())
+    return Process( args, code, stdout.decode( "utf-8", "surrogateescape" ), stderr.decode( "utf-8", "replace" ) )
+
+async def git_paths_async( cmd, paths, cwd = None, timeout = None ):
+    """Run a git command with a list of paths, returns a list of Process tuples
+
+    Like helpers.git(): Large lists of paths are streamed to git via stdin, or split into several
+    git processes, when git does not support "--pathspec-from-file" for the command.
+    """
+    if len( paths ) <= PATHSPEC_THRESHOLD:
+        return [ await git_async( [ cmd ] + paths, cwd, timeout = timeout ) ]
+    if cmd in PATHSPEC_COMMANDS and git_version() >= ( 2, 25 ):
+        return [ await git_async( [ cmd, "--pathspec-from-file=-", "--pathspec-file-nul" ], cwd,
+            b"".join( os.fsencode( path ) + b"\0" for path in paths ), timeout ) ]
+    processes = []
+    budget = argv_budget()
+    start = 0
+    while start < len( paths ):
+        end = chunk_end( paths, start, budget )
+        try:
+            processes.append( await git_async( [ cmd ] + paths[start:end], cwd, timeout = timeout ) )
+        except OSError:
+            if end - start > 1:
+                budget //= 2
+                continue
+            raise
+        if processes[-1].returncode != 0:
+            break
+        start = end
+    return processes
+
+async def status_async( cwd = None, paths = None, settings = None, timeout = None ):
+    """Returns a Result with the status of the repository as a list of status.Entry tuples
+
+    Arguments:
+        cwd: A directory in the repository, defaults to the current working directory
+        paths: Limit the status to these paths
+        settings: The settings dictionary
+        timeout: The status is stopped after this number of seconds
+    """
+    cwd = os.path.expanduser( cwd or os.getcwd() )
+    repository_of( cwd )
+    args = status_module.status_command( paths, settings )
+    process = await git_async( args, cwd, timeout = timeout )
+    records = None
+    if process.returncode == 0:
+        records = list( status_module.parse( io.BytesIO( process.stdout.encode( "utf-8", "surrogateescape" ) ) ) )
+    return Result( None, returncode( [ process ] ), [ process ], records )
+
+async def branches_async( cwd = None, merged = False, timeout = None ):
+    """Returns a Result with the local branches as a list of branches.Branch tuples, the newest first
+
+    Arguments:
+        cwd: A directory in the repository, defaults to the current working directory
+        merged: Only return the branches, which are merged into the HEAD
+        timeout: The command is stopped after this number of seconds
+    """
+    repository = repository_of( os.path.expanduser( cwd or os.getcwd() ) )
+    process = await git_async( branches_module.branches_command( repository, merged ), timeout = timeout )
+    records = None
+    if process.returncode == 0:
+        records = list( branches_module.parse( io.BytesIO( process.stdout.encode( "utf-8", "surrogateescape" ) ) ) )
+    return Result( None, returncode( [ process ] ), [ process ], records )
+
+async def remotes_async( cwd = None ):
+    """Returns a Result with the remotes of the repository as a list of Remote tuples
+
+    The remotes are read from the config of the repository, no git process is started.
+    """
+    remotes = gitconfig.get_remotes( repository_of( os.path.expanduser( cwd or os.getcwd() ) ) )
+    return Result( None, 0, [], [ Remote( name, url ) for name, url in remotes.items() ] )
+
+async def merge_async( repository, plan, target, source, timeout = None ):
+    """Merge source into target without a checkout (see merge.merge_refs())"""
+    if __package__:
+        from .merge import merge_refs
+    else:
+        from merge import merge_refs
+    try:
+        merge = await asyncio.to_thread( merge_refs, repository, target, source )
+    except subprocess.CalledProcessError as exception:
+        process = Process( list( exception.cmd ), exception.returncode,
+                ( exception.stdout or b"" ).decode( "utf-8", "replace" ),
+                ( exception.stderr or b"" ).decode( "utf-8", "replace" ) )
+        return Result( plan, returncode( [ process ] ), [ process ], None )
+    processes = []
+    if merge.state == "current":
+        processes.append( await git_async( [ "merge", source ], repository.worktree, timeout = timeout ) )
+    code = returncode( processes ) or ( 1 if merge.state in ( "conflict", "checked-out" ) else 0 )
+    return Result( plan, code, processes, merge )
+
+async def run_async( args, cwd = None, settings = None, timeout = None ):
+    """Run a G command (i.e. "+ file1 file2" or "@master -> @origin @mirror") and return a Result
+
+    Pushes to several remotes run concurrently. "cd" and "=" only make sense in the
+    interactive shell, they raise a ValueError like all unknown commands and a push or merge
+    of arguments, which are not variables.
+
+    Arguments:
+        args: A string, or a list of the arguments
+        cwd: A directory in the repository, defaults to the current working directory
+        settings: The settings dictionary
+        timeout: Every git process is stopped after this number of seconds
+    """
+    if type( args ) == str:
+        args = args.split()
+    if not args:
+        raise ValueError( "Empty command" )
+    cwd = os.path.expanduser( cwd ) if cwd else None
+    if args[0] in ( "status", "@index" ) and len( args ) == 1:
+        return await status_async( cwd, settings = settings, timeout = timeout )
+    if args[0] == "@branches" and set( args[1:] ) <= set( branches_module.FILTERS ):
+        result = await branches_async( cwd, merged = "merged" in args[1:], timeout = timeout )
+        if result.records is not None and "merged" in args[1:]:
+            result = result._replace( records = [ branch for branch in result.records if not branch.current ] )
+        if result.records is not None and "stale" in args[1:]:
+            days = ( settings or {} ).get( "branches-stale-days" ) or branches_module.DEFAULT_STALE_DAYS
+            result = result._replace( records = [ branch for branch in result.records
+                if branches_module.is_stale( branch, days ) ] )
+        return result
+    if args == [ "@remotes" ]:
+        return await remotes_async( cwd )
+    plan = parse( args )
+    operator, parameter = plan.operator, plan.arguments
+    if not operator or not parameter:
+        raise ValueError( "Unknown command: " + " ".join( args ) )
+    # The paths are relative to cwd, like in the shell
+    cwd = os.path.expanduser( cwd or os.getcwd() )
+    repository = repository_of( cwd )
+    if operator in ( "add", "reset" ):
+        try:
+            paths = expand_manifests( parameter, cwd )
+        except OSError as exception:
+            # Like a git process which could not be started (see git_async())
+            process = Process( [ operator ] + parameter, 1, "", str( exception ) )
+            return Result( plan, 1, [ process ], None )
+        processes = await git_paths_async( operator, paths, cwd, timeout )
+        if returncode( processes ) != 0:
+            return Result( plan, returncode( processes ), processes, None )
+        # Like status.show_status(): Too many paths are limited to their directories (or not at all)
+        status = await status_async( cwd, status_module.changed_pathspecs( paths ), settings, timeout )
+        return Result( plan, status.returncode, processes + status.processes, status.records )
+    elif operator == "push":
+        branch = plan.operands[0][1:]
+        remotes = [ remote[1:] for remote in plan.targets ] or [ "origin" ]
+        processes = await asyncio.gather( *[ git_async( [ "push", remote, branch ], cwd, timeout = timeout )
+            for remote in remotes ] )
+        return Result( plan, returncode( processes ), list( processes ), None )
+    elif operator == "merge" and len( parameter ) == 2:
+        return await merge_async( repository, plan, parameter[0][1:], parameter[1][1:], timeout )
+    elif operator == "merge":
+        process = await git_async( [ "merge", parameter[0][1:] ], cwd, timeout = timeout )
+        return Result( plan, returncode( [ process ] ), [ process ], None )
+    elif operator == "diff":
+        process = await git_async( [ "diff" ] + parameter, cwd, timeout = timeout )
+        return Result( plan, returncode( [ process ] ), [ process ], None )
+    raise ValueError( "The command can not be run via the API: " + " ".join( args ) )
+
+def run( args, cwd = None, settings = None, timeout = None ):
+    """Run a G command in a new event loop, see run_async()"""
+    return asyncio.run( run_async( args, cwd, settings, timeout ) )
+
+def status( cwd = None, paths = None, settings = None, timeout = None ):
+    """Returns the status of a repository, see status_async()"""
+    return asyncio.run( status_async( cwd, paths, settings, timeout ) )
+
+def branches( cwd = None, merged = False, timeout = None ):
+    """Returns the branches of a repository, see branches_async()"""
+    return asyncio.run( branches_async( cwd, merged, timeout ) )
+
+def remotes( cwd = None ):
+    """Returns the remotes of a repository, see remotes_async()"""
+    return asyncio.run( remotes_async( cwd ) )
@@ -0,0 +1,62 @@
+#!/bin/env python3
+# Batch
+
+import subprocess, sys, time
+
+from cli_colors import fg
+from messages import summary
+
+def read_commands( path ):
+    """Returns the commands from a batch file ("-" for stdin), one command per line
+
+    Empty lines and lines which start with "#" are skipped.
+
+    Arguments:
+        path: The path to the batch file
+    """
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open( path, "r" ) as file:
+            lines = file.read().splitlines()
+    return [ line.strip() for line in lines if line.strip() and not line.strip().startswith( "#" ) ]
+
+def run_batch( commands, execute, keep_going = False ):
+    """Execute the commands one after another in this process and show the duration of every command
+
+    All commands share the cached settings and the cached state of the repositories, a "cd"
+    changes the directory of the following commands. Returns the exit code of the first
+    failed command, 0 when all commands succeeded.
+
+    Arguments:
+        commands: A list of commands (i.e. [ "+ file", "@master -> @origin" ])
+        execute: The function which executes the arguments of a command (G.main())
+        keep_going: Execute the remaining commands, when a command has failed
+    """
+    results = []
+    returncode = 0
+    for command in commands:
+        print( fg.blue( "> " + command ) )
+        start = time.perf_counter()
+        code = 0
+        try:
+            # G.main() returns False, when the command is unknown or has failed
+            if execute( command.split() ) is False:
+                code = 1
+        except subprocess.CalledProcessError as exception:
+            code = exception.returncode
+        except SystemExit as exception:
+            # messages.error() stops G via sys.exit()
+            code = exception.code if isinstance( exception.code, int ) else 1
+        except Exception as exception:
+            print( fg.red( "Error: " + str( exception ) ), file = sys.stderr )
+            code = 1
+        results.append( ( command, code, time.perf_counter() - start ) )
+        if code and not returncode:
+            returncode = code
+        if code and not keep_going:
+            break
+    summary( results, title = "Command" )
+    if len( results ) < len( commands ):
+        print( fg.yellow( str( len( commands ) - len( results ) ) + " commands were not executed (use --keep-going)" ) )
+    return returncode
@@ -0,0 +1,36 @@
+#!/bin/env python3
+# Micro-benchmark of the command parser
+#
+# Usage: python3 benchmarks/bench_parser.py [sizes...]
+#
+# Parses "+ file0 file1 ..." with 10k to 100k arguments and prints the best time of
+# some repetitions. The time should grow linearly with the number of arguments.
+
+import os, sys, time
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from command import parse, tokenize
+
+def best_of( function, args, repeat = 5 ):
+    best = None
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        function( args )
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+def main( sizes ):
+    print( "%10s %12s %14s %14s" % ( "tokens", "parse (ms)", "tokenize (ms)", "ns per token" ) )
+    for size in sizes:
+        # Repeat some filenames, the old parser returned wrong indices for them
+        args = [ "+" ] + [ "dir/file" + str( i % ( size // 2 ) ) + ".py" for i in range( size ) ]
+        parse_time = best_of( parse, args )
+        tokenize_time = best_of( tokenize, args )
+        print( "%10d %12.2f %14.2f %14.1f" % ( size, parse_time * 1000, tokenize_time * 1000,
+            parse_time / size * 1e9 ) )
+
+if __name__ == "__main__":
+    main( [ int( size ) for size in sys.argv[1:] ] or [ 10000, 20000, 50000, 100000 ] )
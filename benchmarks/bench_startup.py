@@ -0,0 +1,73 @@
+#!/bin/env python3
+# Startup benchmark of the one-shot mode
+#
+# Usage: python3 benchmarks/bench_startup.py [--budget MILLISECONDS] [--repeat N]
+#
+# Runs one-shot commands via "python3 -X importtime G.py <command>" in a temporary home
+# directory and a temporary repository. The import time of G (everything, which is not
+# already imported by the interpreter itself) must stay below the budget, and some modules
+# must not be imported at all in the one-shot mode. The exit code is 1, when the startup
+# has regressed.
+
+import argparse, os, re, subprocess, sys, tempfile
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+COMMANDS = [ "usage", "status", "@branches", "+ file" ]
+# The import time budget of a one-shot command in milliseconds
+DEFAULT_BUDGET = 60
+# Modules which are only needed by the interactive shell, or by some operators
+FORBIDDEN_MODULES = [ "yaml", "readline", "code", "concurrent.futures", "console", "prompt",
+        "history", "settings", "submodules", "index" ]
+# The forbidden modules, which single commands need: The status (also after add/reset) reads the
+# "status-untracked-cache" and "status-fsmonitor" settings, from the snapshot without yaml
+ALLOWED_MODULES = { "status": [ "settings" ], "+ file": [ "settings" ] }
+
+IMPORTTIME_RE = re.compile( r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$" )
+
+def import_times( args, cwd, env ):
+    """Returns a dictionary of the top-level imports and their cumulative time in microseconds"""
+    process = subprocess.run( [ sys.executable, "-X", "importtime" ] + args, cwd = cwd, env = env,
+            stdout = subprocess.DEVNULL, stderr = subprocess.PIPE )
+    modules = {}
+    for line in process.stderr.decode( "utf-8", "replace" ).splitlines():
+        match = IMPORTTIME_RE.match( line )
+        if match:
+            modules[match.group( 4 )] = ( len( match.group( 3 ) ), int( match.group( 2 ) ) )
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser( description = "Startup benchmark of G's one-shot mode" )
+    parser.add_argument( "--budget", type = float, default = DEFAULT_BUDGET,
+            help = "import time budget per command in milliseconds" )
+    parser.add_argument( "--repeat", type = int, default = 5 )
+    options = parser.parse_args()
+
+    home = tempfile.mkdtemp( prefix = "G-home-" )
+    repository = tempfile.mkdtemp( prefix = "G-repository-" )
+    env = dict( os.environ, HOME = home, GIT_CONFIG_NOSYSTEM = "1" )
+    subprocess.run( [ "git", "init", "-q", repository ], check = True )
+    open( os.path.join( repository, "file" ), "w" ).close()
+
+    baseline = import_times( [ "-c", "pass" ], repository, env )
+    failed = False
+    print( "%-12s %12s  %s" % ( "command", "import (ms)", "forbidden modules" ) )
+    for command in COMMANDS:
+        best = None
+        for _ in range( options.repeat ):
+            modules = import_times( [ os.path.join( ROOT, "G.py" ), command ], repository, env )
+            total = sum( cumulative for name, ( level, cumulative ) in modules.items()
+                    if level == 1 and not name in baseline )
+            best = total if best is None else min( best, total )
+        forbidden = [ module for module in FORBIDDEN_MODULES
+                if module in modules and not module in ALLOWED_MODULES.get( command, [] ) ]
+        milliseconds = best / 1000.0
+        if milliseconds > options.budget or forbidden:
+            failed = True
+        print( "%-12s %12.2f  %s" % ( command, milliseconds, ", ".join( forbidden ) or "-" ) )
+    if failed:
+        print( "Startup regression: the budget is " + str( options.budget ) + " ms per command" )
+    sys.exit( 1 if failed else 0 )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/bin/env python3
+# Benchmark suite of G's hot paths
+#
+# Usage: python3 benchmarks/bench_suite.py [--scale small|medium|large ...] [--scenario NAME ...]
+#                                          [--repeat N] [--output FILE]
+#                                          [--baseline FILE [--threshold RATIO]]
+#
+# Every scenario runs against synthetic fixtures, which are generated in a temporary directory:
+# repositories with many files and refs (via "git fast-import"), bare repositories as local
+# remotes, repositories with submodules and a deep fake home directory. HOME and the global git
+# config point into the temporary directory, so nothing outside of it is read or written and no
+# network access is needed.
+#
+# The results are written as JSON (to stdout or to the output file). When a baseline (a file
+# written by an earlier run) is given, the medians are compared: a scenario which is slower
+# than the baseline by more than the threshold is a regression and the exit code is 1.
+
+import argparse, contextlib, io, json, os, platform, shutil, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+RESULTS_VERSION = 1
+DEFAULT_REPEAT = 5
+# A scenario is a regression, when its median is slower than the baseline by this factor
+DEFAULT_THRESHOLD = 1.25
+
+# The size of the fixtures at every scale
+#   files: The number of files in the repository (and the number of arguments for the parser)
+#   refs: The number of branches and tags in the repository
+#   repositories: The number of repositories in the config.yml file
+#   submodules: The number of repositories with submodules (for update_submodules())
+#   depth, width: The shape of the fake home directory (for find_submodules())
+SCALES = {
+    "small": { "files": 100, "refs": 10, "repositories": 10, "submodules": 2, "depth": 3, "width": 3 },
+    "medium": { "files": 2000, "refs": 200, "repositories": 100, "submodules": 4, "depth": 4, "width": 4 },
+    "large": { "files": 20000, "refs": 2000, "repositories": 1000, "submodules": 8, "depth": 5, "width": 5 },
+}
+DEFAULT_SCALES = [ "small", "medium" ]
+
+def git( *args, cwd = None, input = None ):
+    subprocess.run( [ "git" ] + list( args ), cwd = cwd, input = input, check = True,
+            stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL )
+
+def isolate( workdir ):
+    """Point HOME and the global git config into the working directory
+
+    This has to happen before G's modules are imported, the config path is read on import.
+    """
+    home = os.path.join( workdir, "home" )
+    os.makedirs( home )
+    gitconfig = os.path.join( workdir, "gitconfig" )
+    with open( gitconfig, "w" ) as file:
+        file.write( "[user]\n\tname = G\n\temail = G@localhost\n[init]\n\tdefaultBranch = master\n"
+                "[protocol \"file\"]\n\tallow = always\n" )
+    os.environ.update( HOME = home, GIT_CONFIG_GLOBAL = gitconfig, GIT_CONFIG_NOSYSTEM = "1",
+            GIT_TERMINAL_PROMPT = "0" )
+    return home
+
+def make_repository( path, files, refs ):
+    """Create a repository with one commit which contains files files and refs branches and tags
+
+    The commit is written via "git fast-import", which is much faster than "git add" for
+    thousands of files. Every tenth file is modified afterwards and some untracked files are
+    added, so "status" has something to report.
+    """
+    git( "init", "-q", path )
+    stream = io.BytesIO()
+    stream.write( b"blob\nmark :1\ndata 5\nfile\n" )
+    stream.write( b"commit refs/heads/master\nmark :2\ncommitter G <G@localhost> 0 +0000\ndata 7\ninitial\n" )
+    for i in range( files ):
+        stream.write( b"M 100644 :1 dir%d/file%d.txt\n" % ( i % 50, i ) )
+    stream.write( b"\n" )
+    for i in range( refs ):
+        if i % 2:
+            stream.write( b"reset refs/tags/v%d\nfrom :2\n\n" % i )
+        else:
+            stream.write( b"reset refs/heads/branch%d\nfrom :2\n\n" % i )
+    git( "fast-import", "--quiet", cwd = path, input = stream.getvalue() )
+    git( "checkout", "-q", "-f", "master", cwd = path )
+    for i in range( 0, files, 10 ):
+        with open( os.path.join( path, "dir%d" % ( i % 50 ), "file%d.txt" % i ), "a" ) as file:
+            file.write( "changed\n" )
+    for i in range( max( 1, files // 100 ) ):
+        open( os.path.join( path, "untracked%d.txt" % i ), "w" ).close()
+    return path
+
+def make_fake_home( home, depth, width ):
+    """Create a tree of directories below home, every leaf contains a ".gitmodules" file"""
+    def create( path, level ):
+        if level == depth:
+            open( os.path.join( path, ".gitmodules" ), "w" ).close()
+            return
+        for i in range( width ):
+            subpath = os.path.join( path, "d" + str( i ) )
+            os.makedirs( os.path.join( subpath, "node_modules" ) )
+            create( subpath, level + 1 )
+    root = os.path.join( home, "tree" )
+    os.makedirs( root )
+    create( root, 0 )
+    return root
+
+def make_submodules( workdir, count ):
+    """Create count repositories, which contain a submodule from a bare local remote
+
+    Returns the list of submodules, as it is stored in the config.yml file
+    """
+    remote = os.path.join( workdir, "remote.git" )
+    seed = os.path.join( workdir, "seed" )
+    git( "init", "-q", seed )
+    open( os.path.join( seed, "file" ), "w" ).close()
+    git( "add", "file", cwd = seed )
+    git( "commit", "-q", "-m", "initial", cwd = seed )
+    git( "clone", "-q", "--bare", seed, remote )
+    submodules = []
+    for i in range( count ):
+        parent = os.path.join( workdir, "parent" + str( i ) )
+        git( "init", "-q", parent )
+        git( "submodule", "add", "-q", "file://" + remote, "module", cwd = parent )
+        git( "commit", "-q", "-m", "submodule", cwd = parent )
+        submodules.append( { os.path.join( parent, ".gitmodules" ): { "ignore-dirty": True } } )
+    return submodules
+
+def measure( function, repeat, setup = None ):
+    """Returns the durations of repeat calls of function in milliseconds"""
+    samples = []
+    for _ in range( repeat ):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        samples.append( ( time.perf_counter() - start ) * 1000 )
+    return samples
+
+def quiet( function ):
+    """Returns function, which does not print to stdout"""
+    def wrapper():
+        with contextlib.redirect_stdout( io.StringIO() ):
+            function()
+    return wrapper
+
+def scenarios( workdir, home, params ):
+    """Returns a dictionary of the scenarios for one scale (name: ( function, setup ))"""
+    import command, prompt, settings, status, submodules
+
+    repository = make_repository( os.path.join( workdir, "repository" ), params["files"], params["refs"] )
+    tree = make_fake_home( home, params["depth"], params["width"] )
+    modules = make_submodules( workdir, params["submodules"] )
+
+    config = os.path.join( workdir, "config.yml" )
+    snapshot = os.path.join( workdir, "config.cache" )
+    repositories = [ { os.path.join( workdir, "repository" + str( i ) ): { "remotes": [ { "origin": "file:///remote" } ] } }
+            for i in range( params["repositories"] ) ]
+    settings.SettingsStore( config, snapshot ).write( { "repositories": repositories } )
+    def remove_snapshot():
+        with contextlib.suppress( FileNotFoundError ):
+            os.remove( snapshot )
+    def save():
+        store = settings.SettingsStore( config, snapshot )
+        store.update( lambda values: values["repositories"].append( { "/tmp/another": {} } ) )
+        store.flush()
+
+    args = [ "+" ] + [ "dir/file" + str( i ) + ".txt" for i in range( params["files"] ) ]
+    index_settings = { "index-roots": [ tree ], "index-depth": params["depth"] + 1 }
+    prompt_settings = { "prompt-budget": { name: 60000 for name in prompt.DECORATIONS } }
+    def clear_prompt():
+        os.chdir( repository )
+        prompt._cache.clear()
+
+    return {
+        "parse": ( lambda: command.parse( args ), None ),
+        "settings-parse": ( lambda: settings.SettingsStore( config, snapshot ).get(), remove_snapshot ),
+        "settings-snapshot": ( lambda: settings.SettingsStore( config, snapshot ).get(), None ),
+        "settings-save": ( save, None ),
+        "find-submodules": ( quiet( lambda: submodules.find_submodules( index_settings, full = True ) ), None ),
+        "find-submodules-incremental": ( quiet( lambda: submodules.find_submodules( index_settings ) ), None ),
+        "prompt": ( lambda: prompt.get_prompt( prompt_settings ), clear_prompt ),
+        "update-submodules": ( quiet( lambda: submodules.update_submodules( modules ) ), None ),
+        "update-submodules-force": ( quiet( lambda: submodules.update_submodules( modules, force = True ) ), None ),
+        "status": ( lambda: status.get_status( cwd = repository ), None ),
+    }
+
+def run( scales, names, repeat ):
+    workdir = tempfile.mkdtemp( prefix = "G-bench-" )
+    cwd = os.getcwd()
+    results = []
+    try:
+        home = isolate( workdir )
+        sys.path.insert( 0, ROOT )
+        for scale in scales:
+            scale_dir = os.path.join( workdir, scale )
+            os.makedirs( scale_dir )
+            for name, ( function, setup ) in scenarios( scale_dir, home, SCALES[scale] ).items():
+                if names and not name in names:
+                    continue
+                # The first call warms up the caches of the OS and of git
+                function()
+                samples = measure( function, repeat, setup )
+                results.append( { "scenario": name, "scale": scale, "params": SCALES[scale],
+                    "samples": [ round( sample, 3 ) for sample in samples ],
+                    "min": round( min( samples ), 3 ), "median": round( statistics.median( samples ), 3 ),
+                    "max": round( max( samples ), 3 ) } )
+                print( "%-28s %-8s %10.2f ms" % ( name, scale, statistics.median( samples ) ), file = sys.stderr )
+    finally:
+        os.chdir( cwd )
+        shutil.rmtree( workdir, ignore_errors = True )
+    version = subprocess.run( [ "git", "--version" ], stdout = subprocess.PIPE ).stdout.decode().strip()
+    return { "version": RESULTS_VERSION, "python": platform.python_version(), "git": version,
+            "platform": platform.platform(), "repeat": repeat, "results": results }
+
+def compare( results, baseline, threshold ):
+    """Returns a list of the regressions of results compared to the baseline"""
+    medians = { ( result["scenario"], result["scale"] ): result["median"] for result in baseline.get( "results", [] ) }
+    regressions = []
+    print( "%-28s %-8s %12s %12s %8s" % ( "scenario", "scale", "baseline", "median", "ratio" ), file = sys.stderr )
+    for result in results["results"]:
+        before = medians.get( ( result["scenario"], result["scale"] ) )
+        if not before:
+            continue
+        ratio = result["median"] / before
+        print( "%-28s %-8s %12.2f %12.2f %8.2f%s" % ( result["scenario"], result["scale"], before, result["median"],
+            ratio, "  regression" if ratio > threshold else "" ), file = sys.stderr )
+        if ratio > threshold:
+            regressions.append( result )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser( description = "Benchmark suite of G's hot paths" )
+    parser.add_argument( "--scale", action = "append", choices = list( SCALES ),
+            help = "run the scenarios at this scale (default: small and medium)" )
+    parser.add_argument( "--scenario", action = "append", help = "only run this scenario" )
+    parser.add_argument( "--repeat", type = int, default = DEFAULT_REPEAT )
+    parser.add_argument( "--output", help = "write the results to this file instead of stdout" )
+    parser.add_argument( "--baseline", help = "compare the results with the results of an earlier run" )
+    parser.add_argument( "--threshold", type = float, default = DEFAULT_THRESHOLD,
+            help = "maximal ratio of the median to the median of the baseline" )
+    options = parser.parse_args()
+
+    results = run( options.scale or DEFAULT_SCALES, options.scenario, options.repeat )
+    if options.output:
+        with open( options.output, "w" ) as file:
+            json.dump( results, file, indent = 2 )
+    else:
+        json.dump( results, sys.stdout, indent = 2 )
+        print()
+    if options.baseline:
+        with open( options.baseline, "r" ) as file:
+            regressions = compare( results, json.load( file ), options.threshold )
+        if regressions:
+            print( str( len( regressions ) ) + " regression(s), the threshold is " + str( options.threshold ),
+                    file = sys.stderr )
+            sys.exit( 1 )
+
+if __name__ == "__main__":
+    main()
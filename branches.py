@@ -0,0 +1,183 @@
+#!/bin/env python3
+# Branches
+
+import os, subprocess, threading, time
+
+from collections import namedtuple
+
+if __package__:
+    from .cli_colors import fg
+    from .messages import error, warning
+    from .refs import get_ref_index
+    from .repository import find_repository, read_head
+else:
+    from cli_colors import fg
+    from messages import error, warning
+    from refs import get_ref_index
+    from repository import find_repository, read_head
+
+# name: The short name of the branch (i.e. master)
+# current: True when the branch is checked out
+# upstream: The short name of the upstream branch (i.e. origin/master), "" when there is none
+# ahead, behind: The number of commits in front of and behind the upstream
+# gone: True when the upstream branch was deleted
+# date: The committer date of the last commit (unix time)
+# sha: The sha of the last commit
+# subject: The subject of the last commit
+Branch = namedtuple( "Branch", [ "name", "current", "upstream", "ahead", "behind", "gone", "date", "sha", "subject" ] )
+
+# All fields are separated by NUL bytes, the subject is the last field, so it may contain anything
+FORMAT = "%00".join( [ "%(HEAD)", "%(refname:short)", "%(upstream:short)", "%(upstream:track,nobracket)",
+    "%(committerdate:unix)", "%(objectname)", "%(subject)" ] )
+
+FILTERS = [ "stale", "merged" ]
+# Branches without a commit for this number of days are stale (see the "branches-stale-days" setting)
+DEFAULT_STALE_DAYS = 90
+
+_cache = {}
+_lock = threading.Lock()
+
+def parse_track( track ):
+    """Returns the tuple ( ahead, behind, gone ) for "ahead 1, behind 2" or "gone" """
+    ahead = behind = 0
+    if track == "gone":
+        return 0, 0, True
+    for part in track.split( ", " ):
+        if part.startswith( "ahead " ):
+            ahead = int( part[len( "ahead " ):] )
+        elif part.startswith( "behind " ):
+            behind = int( part[len( "behind " ):] )
+    return ahead, behind, False
+
+def parse( stream ):
+    """Returns a generator of Branch tuples from the output of "git for-each-ref --format=FORMAT"
+
+    Arguments:
+        stream: A binary file object, which is read line by line
+    """
+    for line in stream:
+        fields = line.decode( "utf-8", "replace" ).rstrip( "\n" ).split( "\0", 6 )
+        if len( fields ) < 7:
+            continue
+        head, name, upstream, track, date, sha, subject = fields
+        ahead, behind, gone = parse_track( track )
+        yield Branch( name, head == "*", upstream, ahead, behind, gone, int( date or 0 ), sha, subject )
+
+def branches_command( repository, merged = False ):
+    """Returns the arguments of the for-each-ref command, which lists the branches (see parse())"""
+    command = [ "git", "-C", repository.worktree, "for-each-ref", "--sort=-committerdate",
+            "--format=" + FORMAT ]
+    if merged:
+        command.append( "--merged=HEAD" )
+    return command + [ "refs/heads/" ]
+
+def read_branches( repository, merged = False ):
+    """Returns the local branches of a repository from one "git for-each-ref" call, the newest first
+
+    Arguments:
+        repository: A Repository tuple (see repository.find_repository())
+        merged: Only return the branches which are merged into the HEAD
+    """
+    command = branches_command( repository, merged )
+    process = subprocess.Popen( command, stdout = subprocess.PIPE )
+    try:
+        branches = list( parse( process.stdout ) )
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError( returncode, command )
+    return branches
+
+def config_mtime( repository ):
+    # The upstreams of the branches are stored in the config of the repository
+    try:
+        return os.stat( os.path.join( repository.commondir, "config" ) ).st_mtime_ns
+    except OSError:
+        return None
+
+def get_branches( repository = None, merged = False ):
+    """Returns the (cached) branches of a repository, see read_branches()
+
+    The result is only read again, when the refs (the mtimes of packed-refs and of the
+    directories below refs, see refs.RefIndex), the HEAD or the config have changed.
+    """
+    repository = repository or find_repository()
+    if not repository:
+        return None
+    key = ( get_ref_index( repository ).key, read_head( repository ), config_mtime( repository ) )
+    with _lock:
+        cached = _cache.get( ( repository.commondir, merged ) )
+    if cached and cached[0] == key:
+        return cached[1]
+    branches = read_branches( repository, merged )
+    with _lock:
+        _cache[( repository.commondir, merged )] = ( key, branches )
+    return branches
+
+def is_stale( branch, days, now = None ):
+    """Returns True when the branch has no commits for days, or when its upstream was deleted"""
+    return branch.gone or ( now or time.time() ) - branch.date > days * 86400
+
+def age( date, now = None ):
+    """Returns the age of a unix time as a short string (i.e. "3 days")"""
+    seconds = max( 0, ( now or time.time() ) - date )
+    for unit, length in ( ( "year", 31536000 ), ( "month", 2592000 ), ( "day", 86400 ), ( "hour", 3600 ),
+            ( "minute", 60 ) ):
+        if seconds >= length:
+            count = int( seconds // length )
+            return str( count ) + " " + unit + ( "s" if count > 1 else "" )
+    return "now"
+
+def render( branches, now = None ):
+    """Returns the branches as a list of colored lines"""
+    now = now or time.time()
+    width = max( len( branch.name ) for branch in branches )
+    upstream_width = max( len( branch.upstream ) for branch in branches )
+    lines = []
+    for branch in branches:
+        name = branch.name.ljust( width )
+        line = ( "* " + fg.green( name ) if branch.current else "  " + name ) + "  " + branch.upstream.ljust( upstream_width )
+        if branch.gone:
+            track, plain = fg.red( "gone" ), "gone"
+        else:
+            ahead = "↑" + str( branch.ahead ) if branch.ahead else ""
+            behind = "↓" + str( branch.behind ) if branch.behind else ""
+            track, plain = ( fg.green( ahead ) if ahead else "" ) + ( fg.yellow( behind ) if behind else "" ), ahead + behind
+        # The escape codes of the colors do not take any space
+        line += "  " + track + " " * max( 0, 10 - len( plain ) ) + age( branch.date, now ).rjust( 10 ) + "  " + branch.subject
+        lines.append( line )
+    return lines
+
+def show_branches( filters = None, settings = None ):
+    """Show the local branches with their upstream, the age and the subject of the last commit
+
+    Arguments:
+        filters: A list of filters, "stale" (no commit for "branches-stale-days" days or the
+        upstream is gone) and/or "merged" (merged into the HEAD)
+        settings: The settings dictionary
+    """
+    filters = filters or []
+    unknown = [ name for name in filters if not name in FILTERS ]
+    if unknown:
+        warning( "Unknown filter: " + ", ".join( unknown ) + " (use " + " or ".join( FILTERS ) + ")" )
+        return None
+    repository = find_repository()
+    if not repository:
+        error( "You have not opened a repository" )
+    branches = get_branches( repository, merged = "merged" in filters )
+    if "merged" in filters:
+        branches = [ branch for branch in branches if not branch.current ]
+    if "stale" in filters:
+        if settings is None:
+            if __package__:
+                from .settings import get_settings
+            else:
+                from settings import get_settings
+            settings = get_settings()
+        days = settings.get( "branches-stale-days" ) or DEFAULT_STALE_DAYS
+        now = time.time()
+        branches = [ branch for branch in branches if is_stale( branch, days, now ) ]
+    if branches:
+        print( "\n".join( render( branches ) ) )
+    return branches
@@ -46,3 +46,11 @@ class style():
         return "\033[4m" + text + "\033[0m"
     def blink( text ):
         return "\033[4m" + text + "\033[0m"
+
+class screen():
+    def home():
+        return "\033[H"
+    def clear():
+        return "\033[J"
+    def clear_line():
+        return "\033[K"
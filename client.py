@@ -0,0 +1,41 @@
+#!/bin/env python3
+# Client
+#
+# A thin client for the G daemon (see daemon.py): The arguments, the cwd and the environment
+# are sent to the daemon via a Unix domain socket, together with the stdin, stdout and stderr
+# of this process. When the daemon is not running, G.py is executed instead.
+#
+# Usage: client.py "+ file"
+
+import json, os, socket, sys
+
+def main( argv ):
+    path = os.path.join( os.path.expanduser( "~" ), ".config", "G", "daemon.sock" )
+    args = argv[1].split() if len( argv ) == 2 else argv[1:]
+    connection = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+    try:
+        # The interactive shell, the batch mode and the live views ("@index --watch") are not
+        # executed by the daemon, they would block it for all other clients. "--profile" and
+        # "--trace FILE" measure the process of G itself.
+        if not args or args[0] in ( "-d", "--debug", "--daemon", "--batch" ) or args == [ "-" ] or \
+                args == [ "-", "--keep-going" ] or "--watch" in args or "--profile" in args or "--trace" in args:
+            raise ConnectionRefusedError
+        connection.connect( path )
+    except OSError:
+        # Fall back to G.py, when the daemon is not running
+        connection.close()
+        script = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "G.py" )
+        os.execv( sys.executable, [ sys.executable, script ] + argv[1:] )
+    with connection:
+        request = { "argv": args, "cwd": os.getcwd(), "env": dict( os.environ ) }
+        socket.send_fds( connection, [ json.dumps( request ).encode( "utf-8" ) + b"\n" ], [ 0, 1, 2 ] )
+        response = b""
+        while not response.endswith( b"\n" ):
+            chunk = connection.recv( 4096 )
+            if not chunk:
+                return 1
+            response += chunk
+    return json.loads( response.decode( "utf-8" ) ).get( "status", 1 )
+
+if __name__ == "__main__":
+    sys.exit( main( sys.argv ) )
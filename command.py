@@ -0,0 +1,128 @@
+#!/bin/env python3
+# Command
+
+import os, re
+
+from collections import namedtuple
+
+# The regular expressions are compiled only once, when the module is imported. The tail of
+# PATH_RE is a single character class, a nested repetition would backtrack exponentially
+PATH_RE = re.compile( r"^(([A-Z]\:\\\\)|([\/\\]*[\w]+))[\\\/\w\-\.]*$" )
+VARIABLE_RE = re.compile( r"^\@[\w\-\.\/]*$" )
+
+# Operators which are only recognized as the first argument, or which discard all
+# arguments in front of them (i.e. "foo + file" is the same as "+ file")
+PREFIX_OPERATORS = { "+": "add", "-": "reset" }
+# Operators which can be placed anywhere, only the first of them is used
+INFIX_OPERATORS = { "=": "set", "->": "push", ">": "merge", "cd": "cd", "diff": "diff" }
+
+# Operators whose arguments must all be variables (i.e. "@master -> @origin")
+VARIABLE_OPERATORS = [ "push", "merge" ]
+
+# "+ @file:list.txt" reads the paths from the file list.txt
+MANIFEST_PREFIX = "@file:"
+
+# kind: One of "operator", "manifest", "variable", "path" or "word"
+Token = namedtuple( "Token", [ "kind", "value" ] )
+
+class Plan( namedtuple( "Plan", [ "operator", "operands", "targets" ] ) ):
+    """The parsed command
+
+    Attributes:
+        operator: The name of the operator (i.e. "add", "push"), None when there is no operator
+        operands: The arguments in front of the operator (i.e. "@master" in "@master -> @origin")
+        targets: The arguments after the operator (i.e. the files in "+ file1 file2")
+    """
+
+    __slots__ = ()
+
+    @property
+    def arguments( self ):
+        """Returns all arguments of the command, without the operator"""
+        return self.operands + self.targets
+
+def classify( arg ):
+    """Returns the kind of an argument: "operator", "manifest", "variable", "path" or "word" """
+    if arg in PREFIX_OPERATORS or arg in INFIX_OPERATORS:
+        return "operator"
+    elif arg.startswith( MANIFEST_PREFIX ):
+        return "manifest"
+    elif VARIABLE_RE.match( arg ):
+        return "variable"
+    elif PATH_RE.match( arg ):
+        return "path"
+    return "word"
+
+def tokenize( args ):
+    """Returns a list of tokens for the arguments
+
+    Arguments:
+        args: A string, or a list of the arguments
+    """
+    if type( args ) == str:
+        args = args.split()
+    return [ Token( classify( arg ), arg ) for arg in args ]
+
+def parse( args ):
+    """Parse the tokens of the arguments in a single pass and return a Plan
+
+    The first operator decides what the command does, all arguments in front of it are the
+    operands and all arguments after it are the targets. A "+" or "-" discards the arguments in
+    front of it, the following operators are ignored. Raises a ValueError, when an argument of
+    push or merge is not a variable, or when a push has not exactly one branch in front of "->".
+
+    Arguments:
+        args: A string, or a list of the arguments
+    """
+    operator = None
+    operands = []
+    targets = []
+    for token in tokenize( args ):
+        if token.kind != "operator":
+            ( operands if operator is None else targets ).append( token )
+        elif token.value in PREFIX_OPERATORS:
+            operator = PREFIX_OPERATORS[token.value]
+            operands = []
+            targets = []
+        elif operator is None:
+            operator = INFIX_OPERATORS[token.value]
+    if operator in VARIABLE_OPERATORS:
+        invalid = [ token.value for token in operands + targets if token.kind != "variable" ]
+        if invalid:
+            raise ValueError( "The arguments of " + operator + " must be variables (i.e. @master): " +
+                    " ".join( invalid ) )
+    if operator == "push" and len( operands ) != 1:
+        raise ValueError( "Push exactly one branch to the remotes (i.e. @master -> @origin @mirror)" )
+    return Plan( operator, [ token.value for token in operands ], [ token.value for token in targets ] )
+
+def read_manifest( path, cwd = None ):
+    """Returns the paths from a manifest file
+
+    The paths are separated by newlines, or by NUL bytes (i.e. from "find -print0").
+
+    Arguments:
+        path: The path to the manifest file
+        cwd: The directory of a relative path, defaults to the current working directory
+    """
+    with open( os.path.join( cwd or "", os.path.expanduser( path ) ), "rb" ) as file:
+        content = file.read()
+    separator = b"\0" if b"\0" in content else b"\n"
+    return [ os.fsdecode( line.rstrip( b"\r" ) if separator == b"\n" else line )
+            for line in content.split( separator ) if line.strip() ]
+
+def expand_manifests( args, cwd = None ):
+    """Replace every "@file:list.txt" argument by the paths from the manifest file
+
+    Raises an OSError, when a manifest file can not be read.
+
+    Arguments:
+        args: A list of the arguments
+        cwd: The directory of relative manifest paths, defaults to the current working directory
+    """
+    expanded = []
+    for arg in args:
+        if arg.startswith( MANIFEST_PREFIX ):
+            expanded.extend( read_manifest( arg[len( MANIFEST_PREFIX ):], cwd ) )
+        else:
+            expanded.append( arg )
+    return expanded
@@ -0,0 +1,69 @@
+#!/bin/env python3
+# Completion
+
+import glob, os
+
+from command import MANIFEST_PREFIX
+from refs import get_ref_index
+
+# Only whitespace separates the tokens, so "@", "/" and ":" are part of the completed text
+DELIMITERS = " \t\n"
+
+class Completer():
+    """Readline completer for G's syntax
+
+    Tokens which start with "@" are completed with the branches and remotes of the repository
+    in the cwd (after "->" only with the remotes), which are looked up in the RefIndex (see
+    refs.py). "@file:" and all other tokens are completed with paths.
+    """
+
+    def __init__( self ):
+        self.matches = []
+
+    def complete( self, text, state ):
+        """The completer function for readline.set_completer()"""
+        if state == 0:
+            try:
+                self.matches = self.candidates( text, line_buffer() )
+            except Exception:
+                # Readline silently ignores exceptions, but they would stop the completion
+                self.matches = []
+        if state < len( self.matches ):
+            return self.matches[state]
+        return None
+
+    def candidates( self, text, line ):
+        if text.startswith( MANIFEST_PREFIX ):
+            return [ MANIFEST_PREFIX + path for path in complete_path( text[len( MANIFEST_PREFIX ):] ) ]
+        if text.startswith( "@" ):
+            index = get_ref_index()
+            if not index:
+                return []
+            previous = line[:len( line ) - len( text )].split()
+            if previous and previous[-1] == "->":
+                names = index.remotes( text[1:] )
+            else:
+                names = index.branches( text[1:] ) + index.remotes( text[1:] )
+            return [ "@" + name for name in sorted( set( names ) ) ]
+        return complete_path( text )
+
+def line_buffer():
+    import readline
+    return readline.get_line_buffer()[:readline.get_endidx()]
+
+def complete_path( text ):
+    """Returns the paths which start with text, directories end with a slash"""
+    paths = []
+    for path in glob.glob( glob.escape( os.path.expanduser( text ) ) + "*" ):
+        if text.startswith( "~" ):
+            path = "~" + path[len( os.path.expanduser( "~" ) ):]
+        paths.append( path + "/" if os.path.isdir( os.path.expanduser( path ) ) else path )
+    return sorted( paths )
+
+def install():
+    """Install the completer in readline"""
+    import readline
+    completer = Completer()
+    readline.set_completer_delims( DELIMITERS )
+    readline.set_completer( completer.complete )
+    return completer
@@ -9,33 +9,27 @@ def version():
 def config_dir():
     config_dir = os.path.join( os.path.expanduser( "~" ), ".config", "G" )
     if not os.path.exists( config_dir ):
-        os.makedirs ( config_dir, exists_ok = True )
+        os.makedirs ( config_dir, exist_ok = True )
     return config_dir
 
 def config_file():
-    config_file = os.path.join( os.path.expanduser( "~" ), ".config", "G", "config.yml" )
+    config_file = os.path.join( config_dir(), "config.yml" )
     if not os.path.isfile( config_file ):
         with open( config_file, "w" ) as file:
             file.close()
     return config_file
 
+def settings_snapshot_file():
+    return os.path.join( config_dir(), "config.cache" )
+
+def index_file():
+    return os.path.join( config_dir(), "index.json" )
+
+def submodule_tips_file():
+    return os.path.join( config_dir(), "submodules.json" )
+
 def history_file():
-    history_file = os.path.join( os.path.expanduser( "~" ), ".config", "G", "history" )
-    if not os.path.isfile( history_file ):
-        if count_lines( history_file ) == settings.get( "history-length" ):
-            with open( history_file, "w" ) as file:
-                file.close()
-    return history_file
-
-def count_lines( file ):
-    try:
-        if os.path.isfile( file ):
-            output = subprocess.check_output( [ "wc", "-l" ],
-                    stdin = open( file, "r" ) )
-            return int( output )
-    except OSError:
-        warning( "You need to have installed 'wc' to run 'G' proberly" )
-        pass
-    except FileNotFoundError:
-        pass
+    return os.path.join( config_dir(), "history" )
 
+def socket_file():
+    return os.path.join( config_dir(), "daemon.sock" )
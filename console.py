@@ -0,0 +1,34 @@
+#!/bin/env python3
+# Console
+
+import code, readline
+
+import completion
+
+from history import get_history
+
+class GConsole( code.InteractiveConsole ):
+    """Interactive Console with history and emacs short-cuts
+
+    This class modifies the InteractiveConsole class from the "code" module to
+    support a history, the history file is typically located at the following path:
+        ~/.config/G/history
+    The history is managed by history.HistoryStore, only "history-length" commands
+    are loaded into readline.
+    """
+
+    def __init__( self, locals = None, filename = "<console>", history = None ):
+        code.InteractiveConsole.__init__(self, locals, filename)
+        self.history = history or get_history()
+        self.init_history()
+    def init_history( self ):
+        readline.parse_and_bind( "tab: complete" )
+        completion.install()
+        readline.set_history_length( self.history.length )
+        readline.clear_history()
+        for entry in self.history.list():
+            readline.add_history( entry )
+    def raw_input( self, prompt = "" ):
+        line = code.InteractiveConsole.raw_input( self, prompt )
+        self.history.append( line )
+        return line
@@ -0,0 +1,142 @@
+#!/bin/env python3
+# Coprocess
+
+import atexit, subprocess, threading
+
+from collections import namedtuple
+
+from repository import find_repository
+
+# sha: The full object name, type: "commit", "tree", "blob" or "tag", size: in bytes
+ObjectInfo = namedtuple( "ObjectInfo", [ "sha", "type", "size" ] )
+
+class CatFile():
+    """A long-lived "git cat-file --batch-check" or "git cat-file --batch" process
+
+    Read-only lookups are written to the stdin of the process and the answer is read from its
+    stdout, so a lookup costs one pipe round-trip instead of starting a new git process. When the
+    process has died, it is started again on the next lookup.
+
+    Arguments:
+        gitdir: The git directory of the repository
+        mode: Either "--batch-check" (object info) or "--batch" (object info and content)
+    """
+
+    def __init__( self, gitdir, mode = "--batch-check" ):
+        self.gitdir = gitdir
+        self.mode = mode
+        self.process = None
+        self.lock = threading.Lock()
+
+    def start( self ):
+        self.process = subprocess.Popen( [ "git", "--git-dir", self.gitdir, "cat-file", self.mode ],
+                stdin = subprocess.PIPE, stdout = subprocess.PIPE, stderr = subprocess.DEVNULL )
+
+    def alive( self ):
+        return self.process is not None and self.process.poll() is None
+
+    def request( self, name ):
+        if not self.alive():
+            self.start()
+        self.process.stdin.write( name.encode( "utf-8" ) + b"\n" )
+        self.process.stdin.flush()
+        header = self.process.stdout.readline()
+        if not header:
+            raise BrokenPipeError( "git cat-file exited" )
+        fields = header.decode( "utf-8" ).split()
+        # "<name> missing" or "<name> ambiguous"
+        if len( fields ) != 3:
+            return None, None
+        info = ObjectInfo( fields[0], fields[1], int( fields[2] ) )
+        content = None
+        if self.mode == "--batch":
+            # The content is followed by a newline
+            content = self.process.stdout.read( info.size + 1 )[:-1]
+        return info, content
+
+    def query( self, name ):
+        """Returns a tuple of the ObjectInfo and the content (only in "--batch" mode) of an object
+
+        Returns ( None, None ), when the process fails again after a restart (i.e. git is missing
+        or the repository was removed).
+
+        Arguments:
+            name: Any object name git understands (i.e. "master", "HEAD~2", "HEAD:README")
+        """
+        if "\n" in name:
+            return None, None
+        with self.lock:
+            try:
+                return self.request( name )
+            except ( BrokenPipeError, OSError, ValueError ):
+                # The process has died: Start it again and retry once
+                self.close()
+            try:
+                return self.request( name )
+            except ( BrokenPipeError, OSError, ValueError ):
+                self.close()
+                return None, None
+
+    def close( self ):
+        if self.process:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.process.wait( timeout = 1 )
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+_processes = {}
+_lock = threading.Lock()
+
+def get_cat_file( repository = None, mode = "--batch-check" ):
+    """Returns the coprocess for the repository, it is shared by all callers
+
+    Arguments:
+        repository: A Repository tuple, defaults to the repository of the cwd
+        mode: Either "--batch-check" or "--batch"
+    """
+    repository = repository or find_repository()
+    if not repository:
+        return None
+    with _lock:
+        key = ( repository.gitdir, mode )
+        if not key in _processes:
+            _processes[key] = CatFile( repository.gitdir, mode )
+        return _processes[key]
+
+def close_all():
+    """Stop all coprocesses, this is done automatically when G exits"""
+    with _lock:
+        for cat_file in _processes.values():
+            cat_file.close()
+        _processes.clear()
+
+def close_repository( gitdir ):
+    """Stop the coprocesses of a single repository (i.e. when the repository has changed)"""
+    with _lock:
+        for key in [ key for key in _processes if key[0] == gitdir ]:
+            _processes.pop( key ).close()
+
+atexit.register( close_all )
+
+def object_info( name, repository = None ):
+    """Returns the ObjectInfo of an object, None when it does not exist"""
+    cat_file = get_cat_file( repository )
+    if cat_file:
+        return cat_file.query( name )[0]
+
+def resolve( name, repository = None ):
+    """Returns the sha of an object (i.e. the tip of a branch), None when it does not exist"""
+    info = object_info( name, repository )
+    if info:
+        return info.sha
+
+def read_object( name, repository = None ):
+    """Returns the content of an object as bytes, None when it does not exist"""
+    cat_file = get_cat_file( repository, "--batch" )
+    if cat_file:
+        return cat_file.query( name )[1]
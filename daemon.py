@@ -0,0 +1,150 @@
+#!/bin/env python3
+# Daemon
+
+import json, os, socket, subprocess, sys, threading
+
+import coprocess, index
+
+from config import socket_file
+from messages import success
+from repository import find_repository
+from settings import get_settings
+
+# Only one command is executed at a time: A command changes the cwd, the environment
+# and the file descriptors of the whole process
+_command_lock = threading.Lock()
+# The state of every repository, which was used by a command (see repository_key())
+_repositories = {}
+
+def repository_key( repository ):
+    """Returns the mtimes of the files under the ".git" directory, which change with the repository"""
+    key = []
+    for path in [ repository.gitdir, os.path.join( repository.gitdir, "HEAD" ),
+            os.path.join( repository.gitdir, "index" ), os.path.join( repository.commondir, "packed-refs" ),
+            os.path.join( repository.commondir, "refs", "heads" ), os.path.join( repository.commondir, "objects", "pack" ) ]:
+        try:
+            key.append( os.stat( path ).st_mtime_ns )
+        except OSError:
+            key.append( None )
+    return tuple( key )
+
+def invalidate( cwd ):
+    """Drop the cached state of the repository in cwd, when files under its ".git" directory have changed"""
+    repository = find_repository( cwd )
+    if not repository:
+        return
+    key = repository_key( repository )
+    if _repositories.get( repository.gitdir ) != key:
+        coprocess.close_repository( repository.gitdir )
+        _repositories[repository.gitdir] = key
+
+def execute( request, fds ):
+    """Execute a command for a client and return the exit code
+
+    The stdin, stdout and stderr of the client are passed via the socket (SCM_RIGHTS), so the
+    output of G and git is written directly to the terminal of the client.
+
+    Arguments:
+        request: A dictionary with the arguments ("argv"), the "cwd" and the "env" of the client
+        fds: The stdin, stdout and stderr file descriptors of the client
+    """
+    import G
+
+    if "--watch" in request["argv"]:
+        # A live view never returns, it would hold the lock of all other clients forever
+        # (client.py runs it locally)
+        os.write( fds[2], b"G daemon: \"--watch\" can not be executed by the daemon\n" )
+        return 2
+    with _command_lock:
+        saved_fds = [ os.dup( fd ) for fd in ( 0, 1, 2 ) ]
+        saved_cwd = os.getcwd()
+        saved_env = dict( os.environ )
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            for target, fd in zip( ( 0, 1, 2 ), fds ):
+                os.dup2( fd, target )
+            os.environ.clear()
+            os.environ.update( request.get( "env", {} ) )
+            os.chdir( request["cwd"] )
+            invalidate( request["cwd"] )
+            return 1 if G.main( request["argv"] ) is False else 0
+        except subprocess.CalledProcessError as exception:
+            return exception.returncode
+        except SystemExit as exception:
+            return exception.code if type( exception.code ) == int else 1
+        except Exception as exception:
+            print( "G daemon: " + repr( exception ), file = sys.stderr )
+            return 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for target, fd in zip( ( 0, 1, 2 ), saved_fds ):
+                os.dup2( fd, target )
+                os.close( fd )
+            os.environ.clear()
+            os.environ.update( saved_env )
+            os.chdir( saved_cwd )
+
+def handle( connection ):
+    with connection:
+        fds = []
+        try:
+            message, fds, flags, address = socket.recv_fds( connection, 1 << 20, 3 )
+            buffer = message
+            while not buffer.endswith( b"\n" ):
+                chunk = connection.recv( 1 << 20 )
+                if not chunk:
+                    return
+                buffer += chunk
+            request = json.loads( buffer.decode( "utf-8" ) )
+            if len( fds ) != 3:
+                returncode = 1
+            else:
+                returncode = execute( request, fds )
+            connection.sendall( json.dumps( { "status": returncode } ).encode( "utf-8" ) + b"\n" )
+        except ( OSError, ValueError ):
+            pass
+        finally:
+            for fd in fds:
+                os.close( fd )
+
+def warm_up():
+    """Load the settings and the repository index, before the first client connects"""
+    settings = get_settings()
+    index.scan( settings )
+
+def serve( path = None ):
+    """Start the G daemon, which listens on a Unix domain socket
+
+    The settings, the repository index, the state of the repositories and the git
+    coprocesses are kept in memory between the commands. Use client.py to send
+    commands to the daemon.
+
+    Arguments:
+        path: The path of the socket, defaults to ~/.config/G/daemon.sock
+    """
+    path = path or socket_file()
+    try:
+        os.unlink( path )
+    except FileNotFoundError:
+        pass
+    server = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+    server.bind( path )
+    os.chmod( path, 0o600 )
+    server.listen( 16 )
+    threading.Thread( target = warm_up, daemon = True ).start()
+    success( "G daemon listens on " + path )
+    try:
+        while True:
+            connection, address = server.accept()
+            threading.Thread( target = handle, args = ( connection, ), daemon = True ).start()
+    finally:
+        server.close()
+        os.unlink( path )
+
+if __name__ == "__main__":
+    try:
+        serve()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,114 @@
+#!/bin/env python3
+# Fan-out
+
+import asyncio, os, signal, sys, time
+
+from command import parse
+from messages import block, summary, warning
+from profiling import span
+from settings import get_settings
+
+DEFAULT_WORKERS = 8
+# The default timeout of a command in a single repository in seconds
+DEFAULT_TIMEOUT = 300
+
+# Commands which only make sense in the current shell
+LOCAL_OPERATORS = [ "cd" ]
+
+def registered_repositories( settings = None ):
+    """Returns the paths of all repositories from the "repositories" and "submodules" settings"""
+    settings = settings or get_settings()
+    paths = []
+    for repository in settings.get( "repositories" ) or []:
+        for path in repository:
+            paths.append( os.path.expanduser( path ) )
+    for submodule in settings.get( "submodules" ) or []:
+        for path in submodule:
+            # The submodules are stored as the path to the ".gitmodules" file
+            paths.append( os.path.dirname( os.path.expanduser( path ) ) )
+    # Remove duplicates, but keep the order
+    return list( dict.fromkeys( os.path.normpath( path ) for path in paths ) )
+
+async def run( path, args, semaphore, timeout ):
+    """Run G with the arguments in the repository at path
+
+    Returns a tuple of the path, the exit code (None on a timeout), the duration and the output
+    """
+    async with semaphore:
+        return await run_traced( path, args, timeout )
+
+async def run_traced( path, args, timeout ):
+    with span( "fanout", "fanout " + ( args[0] if args else "" ) ):
+        start = time.monotonic()
+        script = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "G.py" )
+        try:
+            # The command runs in a process group of its own, so it can be stopped together
+            # with all git processes it has started (see below)
+            process = await asyncio.create_subprocess_exec( sys.executable, script, " ".join( args ),
+                    cwd = path, stdout = asyncio.subprocess.PIPE, stderr = asyncio.subprocess.STDOUT,
+                    start_new_session = True )
+        except OSError as exception:
+            return path, 127, time.monotonic() - start, str( exception ) + "\n"
+        try:
+            output, _ = await asyncio.wait_for( process.communicate(), timeout )
+            returncode = process.returncode
+        except asyncio.TimeoutError:
+            kill_group( process )
+            output, _ = await process.communicate()
+            returncode = None
+        except asyncio.CancelledError:
+            # i.e. <C-c>: The process group does not receive the signal of the terminal
+            kill_group( process )
+            raise
+        return path, returncode, time.monotonic() - start, output.decode( "utf-8", "replace" )
+
+def kill_group( process ):
+    """Kill G and all git processes it has started
+
+    Killing only G would leave its git processes running, which keep the pipe open.
+    """
+    try:
+        os.killpg( process.pid, signal.SIGKILL )
+    except ProcessLookupError:
+        pass
+
+async def run_all( paths, args, workers, timeout ):
+    semaphore = asyncio.Semaphore( workers )
+    results = []
+    for future in asyncio.as_completed( [ run( path, args, semaphore, timeout ) for path in paths ] ):
+        path, returncode, duration, output = await future
+        results.append( ( path, returncode, duration ) )
+        block( path, returncode, output )
+    return results
+
+def fanout( args, settings = None ):
+    """Run a G command in all registered repositories concurrently (i.e. "@all status")
+
+    The number of concurrent commands is limited by the "fanout-workers" setting, every command
+    is stopped after "fanout-timeout" seconds. At the end a table shows the status of every
+    repository, registered repositories which do not exist are failed. Returns the results (see
+    messages.failed()), None when the command can not be run in all repositories.
+
+    Arguments:
+        args: The arguments of the command without "@all"
+        settings: The settings dictionary
+    """
+    settings = settings or get_settings()
+    try:
+        plan = parse( args )
+    except ValueError as exception:
+        warning( str( exception ) )
+        return None
+    if not args or args[0] == "@all" or plan.operator in LOCAL_OPERATORS:
+        warning( "This command can not be executed in all repositories" )
+        return None
+    # A repository, which does not exist, fails like a command which could not be started
+    paths = registered_repositories( settings )
+    if not paths:
+        warning( "You have not added repositories or submodules to G" )
+        return None
+    results = asyncio.run( run_all( paths, args,
+        settings.get( "fanout-workers" ) or DEFAULT_WORKERS,
+        settings.get( "fanout-timeout" ) or DEFAULT_TIMEOUT ) )
+    summary( sorted( results ) )
+    return results
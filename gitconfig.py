@@ -0,0 +1,219 @@
+#!/bin/env python3
+# Git config
+
+import os, re, threading
+
+from collections import namedtuple
+
+if __package__:
+    from .repository import find_repository, read_head
+else:
+    from repository import find_repository, read_head
+
+# section and key are lower-case, subsection is case-sensitive (None when there is none)
+Entry = namedtuple( "Entry", [ "section", "subsection", "key", "value" ] )
+
+SECTION_RE = re.compile( r'^\[\s*([\w\.\-]+)\s*(?:"((?:[^"\\]|\\.)*)")?\s*\]' )
+KEY_RE = re.compile( r"^([A-Za-z][\w\-]*)\s*(=?)\s*(.*)$" )
+ESCAPES = { "n": "\n", "t": "\t", "b": "\b", "\\": "\\", '"': '"' }
+
+# Includes can not be nested deeper (the same limit as git)
+MAX_INCLUDE_DEPTH = 10
+
+_cache = {}
+_lock = threading.Lock()
+
+def parse_value( value, leading_space = False ):
+    """Returns the value without quotes, escapes and comments
+
+    Returns the value and True when the line is continued (ends with a backslash). Like git,
+    every whitespace character outside of quotes becomes a space.
+
+    Arguments:
+        value: The value (or the continued line) from the config file
+        leading_space: Keep the whitespace in front of the value (on a continued line)
+    """
+    result = []
+    quoted = False
+    index = 0
+    # Whitespace at the end of the value is removed, but only outside of quotes
+    pending_space = ""
+    while index < len( value ):
+        char = value[index]
+        if char == "\\":
+            if index + 1 == len( value ):
+                return "".join( result ) + pending_space, True
+            result.append( pending_space + ESCAPES.get( value[index + 1], value[index + 1] ) )
+            pending_space = ""
+            index += 2
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char in "#;":
+            break
+        elif not quoted and char.isspace():
+            if result or leading_space:
+                pending_space += " "
+        else:
+            result.append( pending_space + char )
+            pending_space = ""
+        index += 1
+    return "".join( result ), False
+
+def wildmatch( pattern, path ):
+    """Match a path against a pattern, where "**" also matches slashes"""
+    regex = ""
+    index = 0
+    while index < len( pattern ):
+        if pattern.startswith( "**/", index ):
+            regex += "(?:.*/)?"
+            index += 3
+        elif pattern.startswith( "**", index ):
+            regex += ".*"
+            index += 2
+        elif pattern[index] == "*":
+            regex += "[^/]*"
+            index += 1
+        elif pattern[index] == "?":
+            regex += "[^/]"
+            index += 1
+        else:
+            regex += re.escape( pattern[index] )
+            index += 1
+    return re.match( "^" + regex + "$", path ) is not None
+
+def include_condition( condition, path, repository ):
+    """Returns True when the condition of an "includeIf" section is met
+
+    Arguments:
+        condition: The condition (i.e. "gitdir:~/work/" or "onbranch:feature/")
+        path: The path of the config file which contains the condition
+        repository: The Repository tuple the config is read for
+    """
+    if not repository:
+        return False
+    kind, _, pattern = condition.partition( ":" )
+    if kind in ( "gitdir", "gitdir/i" ):
+        if pattern.startswith( "~/" ):
+            pattern = os.path.expanduser( pattern )
+        elif pattern.startswith( "./" ):
+            pattern = os.path.join( os.path.dirname( path ), pattern[2:] )
+        elif not pattern.startswith( "/" ):
+            pattern = "**/" + pattern
+        if pattern.endswith( "/" ):
+            pattern += "**"
+        gitdir = os.path.realpath( repository.gitdir )
+        if kind == "gitdir/i":
+            return wildmatch( pattern.lower(), gitdir.lower() )
+        return wildmatch( pattern, gitdir )
+    elif kind == "onbranch":
+        head = read_head( repository )
+        if not head or not head.ref or not head.ref.startswith( "refs/heads/" ):
+            return False
+        if pattern.endswith( "/" ):
+            pattern += "**"
+        return wildmatch( pattern, head.ref[len( "refs/heads/" ):] )
+    return False
+
+def read_config( path, repository = None, depth = 0, files = None ):
+    """Returns a list of Entry tuples from a config file and the files it includes
+
+    Arguments:
+        path: The path to the config file
+        repository: The Repository tuple, which is used for "includeIf" conditions
+        depth: The depth of the includes
+        files: A list to which the paths of all read files are appended
+    """
+    entries = []
+    if files is not None:
+        files.append( path )
+    try:
+        with open( path, "r", errors = "replace" ) as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return entries
+    section = subsection = None
+    index = 0
+    while index < len( lines ):
+        line = lines[index].strip()
+        index += 1
+        if not line or line[0] in "#;":
+            continue
+        if line.startswith( "[" ):
+            match = SECTION_RE.match( line )
+            if not match:
+                continue
+            section = match.group( 1 ).lower()
+            subsection = match.group( 2 )
+            if subsection is not None:
+                subsection = re.sub( r"\\(.)", r"\1", subsection )
+            elif "." in section:
+                # The deprecated syntax [section.subsection]
+                section, subsection = section.split( ".", 1 )
+            line = line[match.end():].strip()
+            if not line:
+                continue
+        match = KEY_RE.match( line )
+        if not match or section is None:
+            continue
+        key = match.group( 1 ).lower()
+        if not match.group( 2 ):
+            # A key without a value is a boolean
+            value = "true"
+        else:
+            value, continued = parse_value( match.group( 3 ) )
+            while continued and index < len( lines ):
+                more, continued = parse_value( lines[index], leading_space = bool( value ) )
+                value += more
+                index += 1
+        entries.append( Entry( section, subsection, key, value ) )
+        if key == "path" and depth < MAX_INCLUDE_DEPTH and ( section == "include" or
+                ( section == "includeif" and include_condition( subsection or "", path, repository ) ) ):
+            include = os.path.expanduser( value )
+            if not os.path.isabs( include ):
+                include = os.path.join( os.path.dirname( path ), include )
+            entries += read_config( include, repository, depth + 1, files )
+    return entries
+
+def mtimes( files ):
+    key = []
+    for path in files:
+        try:
+            key.append( os.stat( path ).st_mtime_ns )
+        except OSError:
+            key.append( None )
+    return tuple( key )
+
+def get_config( repository = None ):
+    """Returns the entries of the config of a repository (including all included files)
+
+    The result is cached and only read again, when the mtime of one of the read files (or the
+    HEAD, for "includeIf onbranch:") has changed.
+
+    Arguments:
+        repository: A Repository tuple, defaults to the repository of the cwd
+    """
+    repository = repository or find_repository()
+    if not repository:
+        return []
+    path = os.path.join( repository.commondir, "config" )
+    with _lock:
+        cached = _cache.get( path )
+    if cached:
+        files, key, head, entries = cached
+        if mtimes( files ) == key and read_head( repository ) == head:
+            return entries
+    files = []
+    entries = read_config( path, repository, files = files )
+    with _lock:
+        _cache[path] = ( files, mtimes( files ), read_head( repository ), entries )
+    return entries
+
+def get_remotes( repository = None ):
+    """Returns a dictionary with the names and the urls of all remotes of a repository"""
+    remotes = {}
+    for entry in get_config( repository ):
+        if entry.section == "remote" and entry.subsection and entry.key == "url":
+            # The first url of a remote is used for fetching
+            remotes.setdefault( entry.subsection, entry.value )
+    return remotes
@@ -1,48 +1,14 @@
 #!/bin/env python3
 # Helpers
 
-import os, re, subprocess, atexit, code, readline
+import os, re, subprocess, errno, functools, time
 
-from config import history_file
-
-class GConsole( code.InteractiveConsole ):
-    """Interactive Console with history and emacs short-cuts
-
-    This class modifies the InteractiveConsole class from the "code" module to
-    support a history, the history file is typically located at the following path:
-        ~/.config/G/history
-    """
-
-    def __init__( self, locals = None, filename = "<console>",
-            histfile = history_file() ):
-        code.InteractiveConsole.__init__(self, locals, filename)
-        self.init_history( histfile )
-    def init_history( self, histfile ):
-        readline.parse_and_bind( "tab: complete" )
-        if hasattr( readline, "read_history_file" ):
-            try:
-                readline.read_history_file( histfile )
-            except FileNotFoundError:
-                pass
-            atexit.register( self.save_history, histfile )
-    def save_history( self, histfile ):
-        readline.write_history_file( histfile )
-
-def clean_history( history_file = history_file() ):
-    previous_line = None
-    clean_lines = []
-    for line in sorted( open( history_file, "r" ) ):
-        if not line == previous_line:
-            clean_lines.append( line )
-        previous_line = line
-    # Clear the old history file
-    with open( history_file, "w" ) as file:
-        file.close()
-    # Append only lines, that are different to their previous line
-    for line in clean_lines:
-        with open( history_file, "a" ) as file:
-            file.write( line )
-    file.close()
+if __package__:
+    from .messages import block, error, summary
+    from .repository import describe_head, find_repository
+else:
+    from messages import block, error, summary
+    from repository import describe_head, find_repository
 
 def emend_path( path_to_emend ):
     """This function convert a string to an OS independent path"""
@@ -53,46 +19,24 @@ def emend_path( path_to_emend ):
     else:
         return os.getcwd() + os.sep + os.path.join( *path )
 
-def is_path( possible_path ):
-    """Returns True when the possible_branch is a valid path (POSIX/Windows)
-
-    Arguments:
-        possible_path: A string which should be checked if it is a valid path
-    """
-
-    if re.match( r"^(([A-Z]\:\\\\)|([\/\\]*[\w]+))([\\\/]*[\w\-\.]*)*$",
-            os.path.expanduser( possible_path ) ):
-        return True
-    else:
-        return False
-
-def is_variable( possible_variable ):
-    """Returns True when the possible_variable is a branch
-
-    In "G" syntax a variable is escaped by a "@" (i.e. @name_of_branch)
-    This function checks the argument "possible_variable" for exactly this syntax.
-
-    Arguments:
-        possible_variable: A string which should be checked for the branch-syntax of "G"
-    """
-
-    if re.match( r"^\@[\w\-\.\/]*$", possible_variable ):
-        return True
-    else:
-        return False
-
-def is_repository( possible_repository = os.getcwd() ):
-    for file in os.listdir( possible_repository ):
-        if file == ".git":
-            return True
-    return False
+def is_repository( possible_repository = None ):
+    """Returns True when possible_repository (defaults to the cwd) is inside of a repository"""
+    return find_repository( possible_repository ) is not None
 
 def is_empty( element ):
     return len( element ) == 0
 
+# Commands which can read their pathspecs via "--pathspec-from-file" (since git 2.25)
+PATHSPEC_COMMANDS = [ "add", "reset" ]
+# Longer lists of paths are streamed to git instead of passing them as arguments
+PATHSPEC_THRESHOLD = 100
+
 def git( cmd, operand = None  ):
     """Start a git command as a subprocess
 
+    Large lists of paths are streamed to git via stdin (see git_pathspec()), or split
+    into several git processes (see git_chunked()) when the command does not support it.
+
     Arguments:
         cmd: The git command, that should to be executed. This argument must be one
         of the following: "push", "pull", "merge", "add", "reset"
@@ -104,14 +48,136 @@ def git( cmd, operand = None  ):
             subprocess.check_call( [ "git", cmd ] )
         elif type( operand ) == str:
             subprocess.check_call( [ "git", cmd ] + operand.split() )
+        elif len( operand ) > PATHSPEC_THRESHOLD:
+            if cmd in PATHSPEC_COMMANDS and git_version() >= ( 2, 25 ):
+                git_pathspec( cmd, operand )
+            else:
+                git_chunked( cmd, operand )
         else:
             subprocess.check_call( [ "git", cmd ] + operand )
-    except OSError:
+    except OSError as exception:
+        if exception.errno == errno.E2BIG:
+            error( "The argument list is too long" )
         error( "Git need to be installed to proberly use G" )
 
+def capture( args ):
+    """Run a process and capture its output (stdout and stderr)
+
+    Returns a tuple of the exit code (127 when the process could not be started), the duration
+    in seconds and the output
+    """
+    start = time.monotonic()
+    try:
+        process = subprocess.run( args, stdout = subprocess.PIPE, stderr = subprocess.STDOUT )
+        returncode, output = process.returncode, process.stdout.decode( "utf-8", "replace" )
+    except OSError as exception:
+        returncode, output = 127, str( exception ) + "\n"
+    return returncode, time.monotonic() - start, output
+
+def run_concurrently( commands, workers, title = "Repository", finished = None ):
+    """Run processes concurrently and print the output of every process as one block
+
+    The blocks are printed in the order in which the processes finish. At the end a summary
+    with the duration and the exit status of every process is shown. Returns the results (see
+    messages.failed()).
+
+    Arguments:
+        commands: A dictionary of the names (i.e. the paths of repositories) and the arguments of
+        the processes
+        workers: The number of concurrent processes
+        title: The title of the first column of the summary
+        finished: A function, which is called with the name and the exit code of every process
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    results = []
+    with ThreadPoolExecutor( max_workers = max( 1, workers ) ) as pool:
+        futures = { pool.submit( capture, args ): name for name, args in commands.items() }
+        for future in as_completed( futures ):
+            returncode, duration, output = future.result()
+            results.append( ( futures[future], returncode, duration ) )
+            block( futures[future], returncode, output )
+            if finished:
+                finished( futures[future], returncode )
+    summary( sorted( results ), title = title )
+    return results
+
+@functools.lru_cache( maxsize = None )
+def git_version():
+    """Returns the version of git as a tuple of integers (i.e. (2, 39, 5))"""
+    output = subprocess.check_output( [ "git", "--version" ] ).decode( "utf-8" )
+    match = re.search( r"(\d+)\.(\d+)(?:\.(\d+))?", output )
+    return tuple( int( number or 0 ) for number in match.groups() ) if match else ( 0, 0, 0 )
+
+def git_pathspec( cmd, paths ):
+    """Stream the paths NUL-separated to the stdin of a single git process
+
+    Arguments:
+        cmd: A git command which supports "--pathspec-from-file" (see PATHSPEC_COMMANDS)
+        paths: An iterable of paths
+    """
+    process = subprocess.Popen( [ "git", cmd, "--pathspec-from-file=-", "--pathspec-file-nul" ],
+            stdin = subprocess.PIPE )
+    try:
+        for path in paths:
+            process.stdin.write( os.fsencode( path ) + b"\0" )
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+    returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError( returncode, process.args )
+
+def argv_budget():
+    """Returns the number of bytes, that can be used for the arguments of a process"""
+    try:
+        arg_max = os.sysconf( "SC_ARG_MAX" )
+    except ( AttributeError, ValueError, OSError ):
+        # Windows limits the command line to 32767 characters
+        arg_max = 32767
+    environment = sum( len( key ) + len( value ) + 2 + 8 for key, value in os.environ.items() )
+    return max( 4096, arg_max - environment - 4096 )
+
+def chunk_end( paths, start, budget ):
+    """Returns the end of the chunk of paths from start, which fits into budget bytes of arguments"""
+    end, size = start, 0
+    while end < len( paths ) and ( end == start or size + len( os.fsencode( paths[end] ) ) + 9 <= budget ):
+        # Every argument also needs a pointer and a NUL byte
+        size += len( os.fsencode( paths[end] ) ) + 9
+        end += 1
+    return end
+
+def git_chunked( cmd, paths ):
+    """Split the paths into chunks which fit into the argument list of a process
+
+    The size of the chunks is adaptive: When a chunk is still too long (E2BIG),
+    the budget is halved and the chunk is started again.
+
+    Arguments:
+        cmd: The git command, that should to be executed
+        paths: A list of paths
+    """
+    budget = argv_budget()
+    start = 0
+    while start < len( paths ):
+        end = chunk_end( paths, start, budget )
+        try:
+            subprocess.check_call( [ "git", cmd ] + paths[start:end] )
+        except OSError as exception:
+            if exception.errno == errno.E2BIG and end - start > 1:
+                budget //= 2
+                continue
+            raise
+        start = end
+
 def get_current_branch():
-    current_branch = subprocess.check_output( "git rev-parse --abbrev-ref HEAD".split() )
-    # Convert the byte-string to utf-8
-    current_branch = current_branch.decode( "utf-8" )
-    # Return the current branch without the newline character ("\n")
-    return current_branch[:-1]
+    """Returns the current branch, or the abbreviated commit when the HEAD is detached
+
+    The HEAD file is read directly (see repository.read_head()), so no git process is started.
+    """
+    repository = find_repository()
+    if repository:
+        return describe_head( repository )
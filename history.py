@@ -0,0 +1,115 @@
+#!/bin/env python3
+# History
+
+import os, threading
+
+from collections import OrderedDict
+
+from config import history_file
+from settings import get_settings
+
+DEFAULT_LENGTH = 1000
+# The history file is compacted, when it has more lines than history-length * COMPACT_FACTOR
+COMPACT_FACTOR = 2
+
+class HistoryStore():
+    """Append-only history of the commands, which are typed into the interactive shell
+
+    New commands are appended to the end of the history file. In memory the history is an ordered
+    hash map (the commands are the keys), which is used as a ring buffer: A command which is
+    already in the history is moved to the end, and the oldest command is dropped, when the
+    history is longer than "history-length". So every command is at most once in the history
+    and the chronological order is kept.
+
+    The history file is only rewritten (compacted), when it has more lines than
+    COMPACT_FACTOR * "history-length". The file is written to a temporary file, which
+    replaces the history file.
+
+    Arguments:
+        path: The path to the history file, defaults to ~/.config/G/history
+        length: The maximal number of commands, defaults to the "history-length" setting
+    """
+
+    def __init__( self, path = None, length = None ):
+        self.path = path or history_file()
+        self.length = length or get_settings().get( "history-length" ) or DEFAULT_LENGTH
+        self.entries = OrderedDict()
+        self.lines = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load( self ):
+        with self.lock:
+            self.read()
+
+    def read( self ):
+        self.entries = OrderedDict()
+        self.lines = 0
+        try:
+            with open( self.path, "r", errors = "replace" ) as file:
+                for line in file:
+                    self.lines += 1
+                    self.remember( line.rstrip( "\n" ) )
+        except FileNotFoundError:
+            pass
+
+    def remember( self, entry ):
+        if not entry:
+            return
+        if entry in self.entries:
+            self.entries.move_to_end( entry )
+        else:
+            self.entries[entry] = None
+            if len( self.entries ) > self.length:
+                self.entries.popitem( last = False )
+
+    def append( self, entry ):
+        """Append a command to the history
+
+        Arguments:
+            entry: The command which was typed in by the user
+        """
+        entry = entry.strip()
+        if not entry or "\n" in entry:
+            return
+        with self.lock:
+            self.remember( entry )
+            with open( self.path, "a" ) as file:
+                file.write( entry + "\n" )
+            self.lines += 1
+            compact = self.lines > self.length * COMPACT_FACTOR
+        if compact:
+            self.compact()
+
+    def list( self ):
+        """Returns the commands in chronological order"""
+        with self.lock:
+            return list( self.entries )
+
+    def compact( self, force = False ):
+        """Rewrite the history file with the deduplicated commands in one atomic write
+
+        Arguments:
+            force: Rewrite the history file even when it does not exceed the threshold
+        """
+        with self.lock:
+            if not force and self.lines <= self.length * COMPACT_FACTOR:
+                return
+            # Read the file again, other G processes may have appended to it
+            self.read()
+            tmp_path = self.path + "." + str( os.getpid() ) + ".tmp"
+            with open( tmp_path, "w" ) as file:
+                file.write( "".join( entry + "\n" for entry in self.entries ) )
+            os.replace( tmp_path, self.path )
+            self.lines = len( self.entries )
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_history():
+    """Returns the history of this process, the history file is only read once"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
@@ -0,0 +1,163 @@
+#!/bin/env python3
+# Index
+
+import os, json, fnmatch, threading
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import index_file
+from profiling import span
+
+# Directories which never contain repositories worth to be indexed
+DEFAULT_EXCLUDE = [ ".git", "node_modules", "__pycache__", ".venv", "venv", ".tox", ".nox",
+        ".cache", ".local", "site-packages" ]
+DEFAULT_DEPTH = 8
+DEFAULT_WORKERS = 8
+
+INDEX_VERSION = 1
+
+class Index():
+    """On-disk index of all repositories and ".gitmodules" files below some root directories
+
+    For every visited directory the index stores its mtime, its subdirectories and if the
+    directory is a repository or contains a ".gitmodules" file. The mtime of a directory only
+    changes, when an entry is added, removed or renamed in exactly this directory. When the
+    mtime is unchanged, the cached entry is reused and the directory is not listed again.
+    The index is typically located at the following path:
+        ~/.config/G/index.json
+    """
+
+    def __init__( self, path = None ):
+        self.path = path or index_file()
+        self.dirs = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load( self ):
+        try:
+            with open( self.path, "r" ) as file:
+                data = json.load( file )
+            if data.get( "version" ) == INDEX_VERSION:
+                self.dirs = data.get( "dirs", {} )
+        except ( OSError, ValueError ):
+            self.dirs = {}
+
+    def save( self ):
+        """Write the index to a temporary file and replace the old index atomically"""
+        tmp_path = self.path + ".tmp"
+        with self.lock:
+            data = { "version": INDEX_VERSION, "dirs": self.dirs }
+        with open( tmp_path, "w" ) as file:
+            json.dump( data, file, separators = ( ",", ":" ) )
+        os.replace( tmp_path, self.path )
+
+    def clear( self ):
+        with self.lock:
+            self.dirs = {}
+
+    def repositories( self ):
+        """Returns a sorted list of all indexed repositories"""
+        with self.lock:
+            return sorted( path for path, entry in self.dirs.items() if entry.get( "repository" ) )
+
+    def gitmodules( self ):
+        """Returns a sorted list of the paths to all indexed ".gitmodules" files"""
+        with self.lock:
+            return sorted( os.path.join( path, ".gitmodules" )
+                    for path, entry in self.dirs.items() if entry.get( "gitmodules" ) )
+
+    def visit( self, path, exclude ):
+        """Returns the subdirectories of path and updates the entry of path
+
+        The directory is only listed via os.scandir(), when its mtime differs from the
+        cached mtime.
+
+        Arguments:
+            path: The directory which should be visited
+            exclude: A list of glob patterns, matching directories are not indexed
+        """
+        try:
+            mtime = os.stat( path ).st_mtime
+        except OSError:
+            return []
+        with self.lock:
+            entry = self.dirs.get( path )
+        if entry and entry.get( "mtime" ) == mtime:
+            return entry.get( "subdirs", [] )
+        entry = { "mtime": mtime, "subdirs": [], "repository": False, "gitmodules": False }
+        try:
+            with os.scandir( path ) as entries:
+                for dir_entry in entries:
+                    name = dir_entry.name
+                    if name == ".git":
+                        # ".git" is a directory in a repository and a file in
+                        # worktrees and submodules
+                        entry["repository"] = True
+                    elif name == ".gitmodules":
+                        entry["gitmodules"] = True
+                    elif dir_entry.is_dir( follow_symlinks = False ) and not is_excluded( dir_entry.path, exclude ):
+                        entry["subdirs"].append( name )
+        except OSError:
+            pass
+        with self.lock:
+            self.dirs[path] = entry
+        return entry["subdirs"]
+
+    def scan( self, roots, exclude = DEFAULT_EXCLUDE, depth = DEFAULT_DEPTH, workers = DEFAULT_WORKERS ):
+        """Scan the roots in parallel and update the index incrementally
+
+        Arguments:
+            roots: A list of directories from which the repositories are searched
+            exclude: A list of glob patterns, matching directories are not indexed
+            depth: The maximal depth relative to the roots
+            workers: The number of threads that are scanning the directories
+        """
+        seen = set()
+        with span( "index", "index scan" ), ThreadPoolExecutor( max_workers = workers ) as pool:
+            pending = {}
+            for root in roots:
+                root = os.path.abspath( os.path.expanduser( root ) )
+                if os.path.isdir( root ):
+                    pending[pool.submit( self.visit, root, exclude )] = ( root, 0 )
+            while pending:
+                done, _ = wait( pending, return_when = FIRST_COMPLETED )
+                for future in done:
+                    path, level = pending.pop( future )
+                    seen.add( path )
+                    if level >= depth:
+                        continue
+                    for subdir in future.result():
+                        subpath = os.path.join( path, subdir )
+                        if not subpath in seen:
+                            pending[pool.submit( self.visit, subpath, exclude )] = ( subpath, level + 1 )
+        # Forget directories which were removed or are now excluded
+        with self.lock:
+            self.dirs = { path: entry for path, entry in self.dirs.items() if path in seen }
+        self.save()
+        return self
+
+def is_excluded( path, exclude ):
+    """Returns True when the name or the full path of a directory matches one of the exclude globs"""
+    name = os.path.basename( path )
+    for pattern in exclude:
+        if fnmatch.fnmatch( name, pattern ) or fnmatch.fnmatch( path, os.path.expanduser( pattern ) ):
+            return True
+    return False
+
+def scan( settings = None, full = False ):
+    """Update the index with the roots, excludes and depth from the settings
+
+    Arguments:
+        settings: The settings dictionary (keys "index-roots", "index-exclude",
+        "index-depth" and "index-workers")
+        full: Rebuild the index from scratch instead of rescanning it incrementally
+    """
+    settings = settings or {}
+    index = Index()
+    if full:
+        index.clear()
+    return index.scan(
+            roots = settings.get( "index-roots" ) or [ "~" ],
+            exclude = settings.get( "index-exclude" ) or DEFAULT_EXCLUDE,
+            depth = settings.get( "index-depth" ) or DEFAULT_DEPTH,
+            workers = settings.get( "index-workers" ) or DEFAULT_WORKERS )
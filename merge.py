@@ -0,0 +1,137 @@
+#!/bin/env python3
+# Merge
+
+import os, re, subprocess
+
+from collections import namedtuple
+
+if __package__:
+    from .cli_colors import fg
+    from .messages import error, success, warning
+    from .repository import checked_out, find_repository
+else:
+    from cli_colors import fg
+    from messages import error, success, warning
+    from repository import checked_out, find_repository
+
+# tree: The sha of the merged tree (written to the object database, even when there are conflicts)
+# conflicts: A list of the paths with conflicts
+# messages: The informational messages of the merge (i.e. "CONFLICT (content): ...")
+MergeResult = namedtuple( "MergeResult", [ "tree", "conflicts", "messages" ] )
+
+# The sha of an object (SHA-1 or SHA-256)
+OBJECT_ID_RE = re.compile( r"^(?:[0-9a-f]{40}|[0-9a-f]{64})$" )
+
+def run_git( repository, args, check = True ):
+    process = subprocess.run( [ "git", "-C", repository.worktree ] + args, stdout = subprocess.PIPE,
+            stderr = subprocess.PIPE )
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError( process.returncode, process.args, process.stdout, process.stderr )
+    return process
+
+def merge_tree( repository, target, source ):
+    """Merge two commits in memory via "git merge-tree --write-tree" (git >= 2.38)
+
+    Neither the working tree nor the index is touched, only the merged tree is written to the
+    object database.
+
+    Arguments:
+        repository: A Repository tuple (see repository.find_repository())
+        target: The branch into which should be merged
+        source: The branch which should be merged
+    """
+    process = run_git( repository, [ "merge-tree", "--write-tree", "--name-only", "--messages", target, source ],
+            check = False )
+    lines = process.stdout.decode( "utf-8", "replace" ).split( "\n" )
+    # The exit code is 1 when there are conflicts, everything above is an error. An unknown
+    # ref also exits with 1 ("not something we can merge"), but without a tree on stdout
+    if process.returncode > 1 or ( process.returncode == 1 and ( process.stderr.strip() or
+            not OBJECT_ID_RE.match( lines[0] ) ) ):
+        raise subprocess.CalledProcessError( process.returncode, process.args, process.stdout, process.stderr )
+    # The sha of the tree, the conflicting paths, an empty line and the messages
+    separator = lines.index( "" ) if "" in lines else len( lines )
+    return MergeResult( lines[0], lines[1:separator], [ line for line in lines[separator + 1:] if line ] )
+
+def is_ancestor( repository, ancestor, commit ):
+    return run_git( repository, [ "merge-base", "--is-ancestor", ancestor, commit ], check = False ).returncode == 0
+
+# state: "conflict", "up-to-date", "fast-forward", "merged", "current" (the target is the current
+# branch, it has to be merged via "git merge") or "checked-out" (in another working tree)
+# commit: The new tip of the target, None when the target was not updated
+# result: The MergeResult of merge_tree(), None when the merge was not computed
+# worktree: The working tree in which the target is checked out, None when it is not checked out
+Merge = namedtuple( "Merge", [ "state", "commit", "result", "worktree" ] )
+
+def merge_refs( repository, target, source ):
+    """Merge the branch source into the branch target without touching any working tree
+
+    The merge is computed in memory first, nothing is changed when there are conflicts or when
+    the target is checked out. Otherwise the target is updated directly (fast-forward or a
+    merge commit). Returns a Merge tuple.
+
+    Arguments:
+        repository: A Repository tuple (see repository.find_repository())
+        target: The name of the branch into which should be merged
+        source: The name of the branch which should be merged
+    """
+    ref = "refs/heads/" + target
+    other = checked_out( repository, ref )
+    worktree = other.worktree or other.gitdir if other else None
+    # The working trees are compared by their git directories, the working tree of the
+    # main git directory can not be derived from its path (i.e. in submodules)
+    current = other is not None and os.path.realpath( other.gitdir ) == os.path.realpath( repository.gitdir )
+    if other and not current:
+        return Merge( "checked-out", None, None, worktree )
+    result = merge_tree( repository, target, source )
+    if result.conflicts:
+        return Merge( "conflict", None, result, worktree )
+    if current:
+        return Merge( "current", None, result, worktree )
+    old = run_git( repository, [ "rev-parse", "--verify", ref ] ).stdout.decode().strip()
+    commit = run_git( repository, [ "rev-parse", "--verify", source + "^{commit}" ] ).stdout.decode().strip()
+    if is_ancestor( repository, commit, old ):
+        return Merge( "up-to-date", None, result, worktree )
+    if is_ancestor( repository, old, commit ):
+        state, message = "fast-forward", "merge " + source + ": Fast-forward"
+    else:
+        commit = run_git( repository, [ "commit-tree", result.tree, "-p", old, "-p", commit, "-m",
+            "Merge branch '" + source + "' into " + target ] ).stdout.decode().strip()
+        state, message = "merged", "merge " + source + ": Merge made by the 'ort' strategy."
+    # The old value makes sure, that the branch was not moved in the meantime
+    run_git( repository, [ "update-ref", "-m", message, ref, commit, old ] )
+    return Merge( state, commit, result, worktree )
+
+def merge_branches( target, source ):
+    """Merge the branch source into the branch target (i.e. "@target > @source")
+
+    The merge is computed in memory first: When there are conflicts, they are shown and
+    nothing is changed. When the target is the current branch, it is merged via "git merge",
+    otherwise the branch is updated directly (see merge_refs()), so the working tree is not
+    touched at all.
+
+    Arguments:
+        target: The name of the branch into which should be merged
+        source: The name of the branch which should be merged
+    """
+    repository = find_repository()
+    if not repository:
+        error( "You have not opened a repository" )
+    merge = merge_refs( repository, target, source )
+    if merge.state == "checked-out":
+        warning( "The branch \"" + target + "\" is checked out in " + merge.worktree + ", merge it there" )
+        return False
+    if merge.state == "conflict":
+        warning( "Merging \"" + source + "\" into \"" + target + "\" conflicts, nothing was changed:" )
+        for path in merge.result.conflicts:
+            print( "  " + fg.red( path ) )
+        for message in merge.result.messages:
+            print( "  " + message )
+        return False
+    if merge.state == "current":
+        # The merge is meant for the current branch, only now the working tree is touched
+        subprocess.check_call( [ "git", "-C", repository.worktree, "merge", source ] )
+    elif merge.state == "up-to-date":
+        success( "The branch \"" + target + "\" is already up to date" )
+    else:
+        success( "Merged \"" + source + "\" into \"" + target + "\" (" + merge.commit[:7] + ")" )
+    return True
@@ -1,7 +1,10 @@
 #!/bin/env python3
 # Messages
 
-from cli_colors import fg
+if __package__:
+    from .cli_colors import fg
+else:
+    from cli_colors import fg
 import sys
 
 def error( message ):
@@ -29,6 +32,47 @@ def success( message ):
     """
     print( fg.green( message ) )
 
+def block( name, returncode, output ):
+    """Prints the captured output of a command as one block, below its name (green when it succeeded)
+
+    Arguments:
+        name: The name of the repository or the remote
+        returncode: The exit code, None for a timeout
+        output: The captured output
+    """
+    print( fg.green( name ) if returncode == 0 else fg.red( name ) )
+    if output:
+        print( output.rstrip( "\n" ) )
+
+def summary( results, title = "Repository" ):
+    """Prints a table with the duration and the exit status of every repository
+
+    Arguments:
+        results: A list of tuples of the path, the exit code (None for a timeout)
+        and the duration in seconds
+        title: The title of the first column
+    """
+    if not results:
+        return
+    width = max( [ len( title ) ] + [ len( path ) for path, returncode, duration in results ] )
+    line = "+-" + "-" * width + "-+----------+---------+"
+    print( line )
+    print( "| " + title.ljust( width ) + " | Duration | Status  |" )
+    print( line )
+    for path, returncode, duration in results:
+        if returncode == 0:
+            status = fg.green( "ok".ljust( 7 ) )
+        elif returncode is None:
+            status = fg.red( "timeout" )
+        else:
+            status = fg.red( str( returncode ).ljust( 7 ) )
+        print( "| " + path.ljust( width ) + " | " + ( "%.2fs" % duration ).rjust( 8 ) + " | " + status + " |" )
+    print( line )
+
+def failed( results ):
+    """Returns True when one of the results (see summary()) has a non-zero exit code or a timeout"""
+    return any( returncode != 0 for path, returncode, duration in results or [] )
+
 def usage():
     """Display usage information
 
@@ -45,10 +89,14 @@ SYNTAX COMPARED TO GIT:
 | Task                        | Git syntax                                   | G Syntax                  |
 +-----------------------------+----------------------------------------------+---------------------------+
 | Add files to the index      | git add file1 file2                          | + file1 file2             |
+| Add files from a list       | git add --pathspec-from-file=list.txt        | + @file:list.txt          |
 | Remove files from the index | git reset file1 file2                        | - file1 file2             |
 | Push to a remote repository | git push origin master                       | @master -> @origin        |
+| Push to several remotes     | git push origin master; git push mirror ...  | @master -> @a @b @c       |
 | Merge branches              | git merge feature-branch                     | @feature-branch > @master |
 | Update all submodules       | git submodule foreach git pull origin master | update                    |
+| Run in all repositories     | (a shell loop over the repositories)         | @all status               |
+| Run commands from a file    | (a shell script)                             | G --batch commands.txt    |
 +-----------------------------+----------------------------------------------+---------------------------+\
 """
     print( usage )
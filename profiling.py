@@ -0,0 +1,182 @@
+#!/bin/env python3
+# Profiling
+
+import os, subprocess, threading, time
+
+from contextlib import contextmanager
+
+# Span: A single measured operation
+#   category: "git", "settings", "index", ...
+#   name: The name of the operation (i.e. "git status" or "settings parse")
+#   start, duration: Wall time in seconds (start is relative to the start of the recording)
+#   cpu: CPU time in seconds (of the git process, or of the thread), None when it is unknown
+#   returncode: The exit code of a process, None for operations in G itself
+#   argv: The arguments of a process
+#   thread: The ident and the name of the thread which started the operation
+class Span():
+    __slots__ = ( "category", "name", "start", "duration", "cpu", "returncode", "argv", "thread" )
+
+    def __init__( self, category, name, start, duration, cpu = None, returncode = None, argv = None ):
+        self.category = category
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.cpu = cpu
+        self.returncode = returncode
+        self.argv = argv
+        current = threading.current_thread()
+        self.thread = ( current.ident, current.name )
+
+enabled = False
+_origin = time.perf_counter()
+_spans = []
+_lock = threading.Lock()
+_Popen = subprocess.Popen
+
+def record( span ):
+    with _lock:
+        _spans.append( span )
+
+@contextmanager
+def span( category, name ):
+    """Measure the wall and the CPU time of the block (only when the profiling is enabled)
+
+    Arguments:
+        category: The category of the operation (i.e. "settings")
+        name: The name of the operation (i.e. "settings parse")
+    """
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        record( Span( category, name, start - _origin, time.perf_counter() - start, time.thread_time() - cpu ) )
+
+def operation( argv ):
+    """Returns the name of a git operation, i.e. "git status" for [ "git", "-C", "path", "status" ]"""
+    args = [ os.fsdecode( arg ) for arg in argv ] if not isinstance( argv, ( str, bytes ) ) else str( argv ).split()
+    if not args or os.path.basename( args[0] ) != "git":
+        return os.path.basename( args[0] ) if args else "?"
+    index = 1
+    while index < len( args ) and args[index].startswith( "-" ):
+        # Options with a separate value
+        index += 2 if args[index] in ( "-C", "-c", "--git-dir", "--work-tree" ) else 1
+    return "git " + args[index] if index < len( args ) else "git"
+
+class TracedPopen( _Popen ):
+    """subprocess.Popen, which records every process as a span
+
+    The process is reaped via os.wait4() in wait() and poll(), which also returns the CPU time
+    of the process. The span of a process, which is reaped otherwise (i.e. by wait() with a
+    timeout), is recorded without the CPU time.
+    """
+
+    def __init__( self, args, *posargs, **kwargs ):
+        self._trace_start = time.perf_counter()
+        self._trace_thread = threading.current_thread()
+        self._trace_recorded = False
+        super().__init__( args, *posargs, **kwargs )
+
+    def wait( self, timeout = None ):
+        if self.returncode is None and timeout is None:
+            self._trace_wait( 0 )
+        returncode = super().wait( timeout )
+        self._trace_record()
+        return returncode
+
+    def poll( self ):
+        if self.returncode is None:
+            self._trace_wait( os.WNOHANG )
+        returncode = super().poll()
+        if returncode is not None:
+            self._trace_record()
+        return returncode
+
+    def _trace_wait( self, flags ):
+        try:
+            pid, status, usage = os.wait4( self.pid, flags )
+        except ChildProcessError:
+            # The process was reaped already, Popen finds out on its own
+            return
+        if pid == self.pid:
+            self.returncode = os.waitstatus_to_exitcode( status )
+            self._trace_record( usage )
+
+    def _trace_record( self, usage = None ):
+        if self._trace_recorded:
+            return
+        self._trace_recorded = True
+        name = operation( self.args )
+        span = Span( "git" if name.startswith( "git" ) else "process", name, self._trace_start - _origin,
+                time.perf_counter() - self._trace_start, usage.ru_utime + usage.ru_stime if usage else None,
+                self.returncode,
+                [ os.fsdecode( arg ) for arg in self.args ] if not isinstance( self.args, ( str, bytes ) ) else [ str( self.args ) ] )
+        span.thread = ( self._trace_thread.ident, self._trace_thread.name )
+        record( span )
+
+def enable():
+    """Record all processes (via subprocess.Popen) and all spans from now on"""
+    global enabled
+    enabled = True
+    if hasattr( os, "wait4" ):
+        subprocess.Popen = TracedPopen
+
+def spans():
+    with _lock:
+        return list( _spans )
+
+def percentile( values, fraction ):
+    values = sorted( values )
+    return values[min( len( values ) - 1, int( round( fraction * ( len( values ) - 1 ) ) ) )]
+
+def summary():
+    """Returns the per operation latency summary (in milliseconds) as a list of lines"""
+    operations = {}
+    for span in spans():
+        operations.setdefault( span.name, [] ).append( span )
+    lines = [ "%-28s %6s %10s %9s %9s %9s %9s %10s" % ( "operation", "count", "total", "p50", "p90", "p99",
+        "max", "cpu" ) ]
+    for name, items in sorted( operations.items(), key = lambda item: -sum( span.duration for span in item[1] ) ):
+        durations = [ span.duration * 1000 for span in items ]
+        cpu = sum( span.cpu or 0 for span in items ) * 1000
+        failed = sum( 1 for span in items if span.returncode )
+        lines.append( "%-28s %6d %10.2f %9.2f %9.2f %9.2f %9.2f %10.2f%s" % ( name[:28], len( items ), sum( durations ),
+            percentile( durations, 0.5 ), percentile( durations, 0.9 ), percentile( durations, 0.99 ),
+            max( durations ), cpu, "  (" + str( failed ) + " failed)" if failed else "" ) )
+    return lines
+
+def write_trace( path ):
+    """Write all spans as Chrome trace events (open the file via chrome://tracing or Perfetto)
+
+    Every thread (i.e. the submodule discovery in the background) is a track on its own.
+    """
+    import json
+    pid = os.getpid()
+    events = []
+    threads = {}
+    for span in spans():
+        threads[span.thread[0]] = span.thread[1]
+        args = { "category": span.category }
+        if span.argv is not None:
+            args["argv"] = span.argv
+        if span.returncode is not None:
+            args["exit"] = span.returncode
+        if span.cpu is not None:
+            args["cpu_ms"] = round( span.cpu * 1000, 3 )
+        events.append( { "name": span.name, "cat": span.category, "ph": "X", "pid": pid, "tid": span.thread[0],
+            "ts": round( span.start * 1e6, 1 ), "dur": round( span.duration * 1e6, 1 ), "args": args } )
+    for ident, name in threads.items():
+        events.append( { "name": "thread_name", "ph": "M", "pid": pid, "tid": ident, "args": { "name": name } } )
+    with open( path, "w" ) as file:
+        json.dump( { "traceEvents": events, "displayTimeUnit": "ms" }, file )
+
+def report( profile = False, trace = None ):
+    """Print the summary and/or write the trace file, this is registered via atexit"""
+    if profile:
+        import sys
+        print( "\n".join( summary() ), file = sys.stderr )
+    if trace:
+        write_trace( trace )
@@ -0,0 +1,161 @@
+#!/bin/env python3
+# Prompt
+
+import os, subprocess, threading, time
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cli_colors import fg
+from repository import describe_head, find_repository, read_head
+from settings import get_settings
+
+DEFAULT_DECORATIONS = [ "dirty", "ahead-behind", "stash" ]
+# The default time budget of a decoration in milliseconds
+DEFAULT_BUDGET = 30
+
+def budget_of( budgets, name ):
+    """Returns the time budget of a decoration in seconds
+
+    Arguments:
+        budgets: The "prompt-budget" setting, a number of milliseconds for all decorations, or a
+        dictionary with the milliseconds of single decorations (i.e. { "dirty": 50, "stash": 10 })
+        name: The name of the decoration
+    """
+    if isinstance( budgets, dict ):
+        budgets = budgets.get( name, DEFAULT_BUDGET )
+    if isinstance( budgets, bool ) or not isinstance( budgets, ( int, float ) ):
+        budgets = DEFAULT_BUDGET
+    return budgets / 1000.0
+
+# The thread pool is created with the first prompt
+_pool = None
+# The last computed value of every decoration, keyed on the state of the repository
+_cache = {}
+# The decorations which are computed at the moment
+_running = {}
+_lock = threading.Lock()
+
+def run_git( repository, args ):
+    # The decorations run in the background, while the user types: They must not take the
+    # index.lock to refresh the index, otherwise the next "git add" of the user would fail
+    try:
+        process = subprocess.run( [ "git", "--no-optional-locks", "-C", repository.worktree ] + args,
+                stdout = subprocess.PIPE, stderr = subprocess.DEVNULL )
+    except OSError:
+        return None
+    if process.returncode != 0:
+        return None
+    return process.stdout.decode( "utf-8", "replace" )
+
+def dirty( repository ):
+    """Returns True when tracked files of the repository are modified"""
+    output = run_git( repository, [ "status", "--porcelain", "--untracked-files=no" ] )
+    if output is None:
+        return None
+    return bool( output )
+
+def ahead_behind( repository ):
+    """Returns the number of commits the current branch is ahead and behind of its upstream"""
+    output = run_git( repository, [ "rev-list", "--left-right", "--count", "HEAD...@{upstream}" ] )
+    if not output:
+        return None
+    ahead, behind = output.split()
+    return int( ahead ), int( behind )
+
+def stash( repository ):
+    """Returns the number of stashes, they are counted from the reflog of refs/stash (no git process)"""
+    try:
+        with open( os.path.join( repository.commondir, "logs", "refs", "stash" ), "rb" ) as file:
+            return sum( 1 for line in file )
+    except OSError:
+        return 0
+
+DECORATIONS = { "dirty": dirty, "ahead-behind": ahead_behind, "stash": stash }
+
+def state_key( repository ):
+    """Returns a key which identifies the state of the repository (the HEAD)"""
+    return ( repository.gitdir, read_head( repository ) )
+
+def compute( name, key, repository ):
+    try:
+        value = DECORATIONS[name]( repository )
+        with _lock:
+            _cache[( name, key )] = value
+        return value
+    finally:
+        with _lock:
+            _running.pop( ( name, key ), None )
+
+def decorate( repository, settings = None ):
+    """Returns a dictionary with the values of all decorations, that are ready in time
+
+    Every decoration is computed on a thread pool. The prompt waits for every decoration as long
+    as its time budget from the "prompt-budget" setting (in milliseconds) allows it. When a
+    decoration is not ready in time, the last value for the same state of the repository is used
+    and the computation goes on in the background, while the user types.
+
+    The "prompt-budget" setting is either one number for all decorations ("prompt-budget: 50"),
+    or a dictionary with the budgets of single decorations, the others keep the default budget:
+
+        prompt-budget:
+            dirty: 100
+            stash: 10
+
+    Arguments:
+        repository: A Repository tuple (see repository.find_repository())
+        settings: The settings dictionary
+    """
+    settings = settings or get_settings()
+    names = settings.get( "prompt-decorations", DEFAULT_DECORATIONS ) or []
+    budgets = settings.get( "prompt-budget" )
+    key = state_key( repository )
+    futures = {}
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor( max_workers = 4 )
+        for name in names:
+            if not name in DECORATIONS:
+                continue
+            if not ( name, key ) in _running:
+                _running[( name, key )] = _pool.submit( compute, name, key, repository )
+            futures[name] = _running[( name, key )]
+    start = time.monotonic()
+    values = {}
+    for name, future in futures.items():
+        budget = budget_of( budgets, name )
+        wait( [ future ], timeout = max( 0, start + budget - time.monotonic() ) )
+        if future.done() and not future.exception():
+            values[name] = future.result()
+        else:
+            with _lock:
+                values[name] = _cache.get( ( name, key ) )
+    return values
+
+def render( values ):
+    """Returns the decorations as a colored string"""
+    decorations = ""
+    if values.get( "dirty" ):
+        decorations += fg.red( "*" )
+    if values.get( "ahead-behind" ):
+        ahead, behind = values["ahead-behind"]
+        if ahead:
+            decorations += fg.green( "↑" + str( ahead ) )
+        if behind:
+            decorations += fg.yellow( "↓" + str( behind ) )
+    if values.get( "stash" ):
+        decorations += fg.violett( "$" + str( values["stash"] ) )
+    return decorations
+
+def get_prompt( settings = None ):
+    """Returns the prompt of the interactive shell
+
+    When the current directory is a repository the prompt is also decorated with the branches
+    name and the decorations (see decorate()).
+    """
+    repository = find_repository()
+    if repository:
+        branch = describe_head( repository )
+        if branch:
+            return "G:" + fg.blue( branch ) + render( decorate( repository, settings ) ) + " " + fg.red( ">" ) + " "
+    return "G " + fg.red( ">" ) + " "
@@ -0,0 +1,119 @@
+#!/bin/env python3
+# Refs
+
+import bisect, os, threading
+
+if __package__:
+    from .profiling import span
+    from .repository import find_repository
+else:
+    from profiling import span
+    from repository import find_repository
+
+class RefIndex():
+    """Sorted index of all refs of a repository, read without starting git
+
+    The refs are read from the packed-refs file and from the loose refs in the refs
+    directory. The index is only built again, when the mtime of the packed-refs file or
+    of a directory below refs has changed (git creates, updates and deletes loose refs
+    by renaming files in these directories).
+
+    Arguments:
+        commondir: The git directory which contains the refs (see repository.Repository)
+    """
+
+    def __init__( self, commondir ):
+        self.commondir = commondir
+        self.key = None
+        self.refs = {}
+        self.names = []
+        self.lock = threading.Lock()
+
+    def state( self ):
+        """Returns the mtimes of the packed-refs file and of all directories below refs"""
+        key = []
+        try:
+            key.append( os.stat( os.path.join( self.commondir, "packed-refs" ) ).st_mtime_ns )
+        except OSError:
+            key.append( None )
+        stack = [ os.path.join( self.commondir, "refs" ) ]
+        while stack:
+            path = stack.pop()
+            try:
+                key.append( ( path, os.stat( path ).st_mtime_ns ) )
+                with os.scandir( path ) as entries:
+                    for entry in entries:
+                        if entry.is_dir( follow_symlinks = False ):
+                            stack.append( entry.path )
+            except OSError:
+                pass
+        return tuple( key )
+
+    def read( self ):
+        refs = {}
+        try:
+            with open( os.path.join( self.commondir, "packed-refs" ), "r" ) as file:
+                for line in file:
+                    # Skip the header and peeled tags ("^<sha>")
+                    if line[0] in "#^":
+                        continue
+                    sha, name = line.rstrip( "\n" ).split( " ", 1 )
+                    refs[name] = sha
+        except OSError:
+            pass
+        # Loose refs take precedence over packed refs
+        refs_dir = os.path.join( self.commondir, "refs" )
+        for dirpath, dirnames, filenames in os.walk( refs_dir ):
+            for filename in filenames:
+                if filename.endswith( ".lock" ):
+                    continue
+                path = os.path.join( dirpath, filename )
+                try:
+                    with open( path, "r" ) as file:
+                        value = file.readline().strip()
+                except OSError:
+                    continue
+                refs["refs/" + os.path.relpath( path, refs_dir ).replace( os.sep, "/" )] = value
+        return refs
+
+    def update( self ):
+        """Build the index again, when the refs have changed"""
+        with self.lock:
+            key = self.state()
+            if key != self.key:
+                with span( "refs", "refs read" ):
+                    self.refs = self.read()
+                self.names = sorted( self.refs )
+                self.key = key
+            return self
+
+    def prefixed( self, prefix ):
+        """Returns all ref names, which start with prefix (binary search in the sorted names)"""
+        start = bisect.bisect_left( self.names, prefix )
+        end = bisect.bisect_left( self.names, prefix + "\U0010ffff" )
+        return self.names[start:end]
+
+    def branches( self, prefix = "" ):
+        """Returns the local branches and the remote-tracking branches (i.e. "origin/master")"""
+        branches = [ name[len( "refs/heads/" ):] for name in self.prefixed( "refs/heads/" + prefix ) ]
+        branches += [ name[len( "refs/remotes/" ):] for name in self.prefixed( "refs/remotes/" + prefix )
+                if not name.endswith( "/HEAD" ) ]
+        return branches
+
+    def remotes( self, prefix = "" ):
+        """Returns the names of the remotes, which have remote-tracking branches"""
+        return sorted( set( name[len( "refs/remotes/" ):].split( "/", 1 )[0]
+            for name in self.prefixed( "refs/remotes/" + prefix ) ) )
+
+_indexes = {}
+_lock = threading.Lock()
+
+def get_ref_index( repository = None ):
+    """Returns the (cached) RefIndex of the repository, defaults to the repository of the cwd"""
+    repository = repository or find_repository()
+    if not repository:
+        return None
+    with _lock:
+        if not repository.commondir in _indexes:
+            _indexes[repository.commondir] = RefIndex( repository.commondir )
+        return _indexes[repository.commondir].update()
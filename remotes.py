@@ -1,53 +1,107 @@
 #!/bin/env python3
 # Remotes
 
-import os
+import os, subprocess
+
+import gitconfig
 
 from cli_colors import fg
-from settings import get_settings
-from messages import warning
-
-def get_remotes( settings = get_settings() ):
-    """Get all remotes, from the current repository (the current working directory)"""
-    for repository in settings.get( "repositories" ):
-        for path, values in repository.items():
-            if os.path.expanduser( path ) == os.getcwd():
-                return values.get( "remotes" )
-            else:
-                return False
+from helpers import run_concurrently
+from repository import find_repository
+from settings import get_settings, update_settings
+from messages import error, warning
+
+# The index of the "repositories" setting (see repository_index())
+_index = ( None, {} )
+
+def repository_index( settings = None ):
+    """Returns a dictionary of the "repositories" setting, keyed on the expanded paths
+
+    The index is built once for every loaded settings dictionary (see settings.SettingsStore).
+    """
+    global _index
+    settings = settings or get_settings()
+    if _index[0] is not settings:
+        index = {}
+        for repository in settings.get( "repositories" ) or []:
+            for path, values in repository.items():
+                index[os.path.normpath( os.path.expanduser( path ) )] = values or {}
+        _index = ( settings, index )
+    return _index[1]
+
+def get_remotes( settings = None ):
+    """Get all remotes, from the current repository (the current working directory)
+
+    The remotes are read from the config of the repository (.git/config and the files it
+    includes), remotes which are only stored in the config.yml file are appended.
+    Returns a list of dictionaries ({ name: url }), or False when there are no remotes.
+    """
+    repository = find_repository()
+    if not repository:
+        return False
+    remotes = gitconfig.get_remotes( repository )
+    values = repository_index( settings ).get( os.path.normpath( repository.worktree ), {} )
+    for remote in values.get( "remotes" ) or []:
+        for name, url in remote.items():
+            remotes.setdefault( name, url )
+    return [ { name: url } for name, url in remotes.items() ] or False
 
 def show_remotes():
-    if get_remotes():
+    remotes = get_remotes()
+    if remotes:
         print( fg.green( "Remotes:" ) )
-        for remote in get_remotes():
+        for remote in remotes:
             for name, url in remote.items():
                 print( "  - " + name + ": " + url )
     else:
         warning( "Your repository does not have any remotes, or you have not opened a repository" )
 
 def add_remote( name, url ):
-    """Add a new remote to the config.yml file
+    """Add a new remote to the current repository
 
-    When no remotes are defined in the current repository into the config.yml file.
-    This function adds a new remote to the current repository. The current working
-    directory is used as the name for the current repository.
+    The remote is written to the config of the repository via "git remote add", the
+    repository itself is added to the "repositories" in the config.yml file.
 
     Arguments:
         name: The name for the remote (i.e. origin)
         url: The url to the remote repository (i.e. git@github.com:kokakolako/G.git)
     """
-    cwd = os.getcwd()
-    remotes = get_remotes()
-    repositories = settings.get( "repositories" )
-    if not remotes:
-        repositories.append( { cwd: { "remotes": [ { name: url }] } } )
-    else:
-        if not name in [ list( remote.keys() )[0] for remote in remotes ]:
-            remotes.append( { name: url } )
-    for repository in repositories:
-        for path, values in repository.items():
-            if os.path.expanduser( path ) == cwd:
-                for name, url in remotes:
-                        values["remotes"] = remotes
-    save_settings( settings )
+    repository = find_repository()
+    if not repository:
+        error( "You have not opened a repository" )
+    if name in gitconfig.get_remotes( repository ):
+        warning( "The remote \"" + name + "\" already exists" )
+        return
+    subprocess.check_call( [ "git", "-C", repository.worktree, "remote", "add", name, url ] )
+    path = os.path.normpath( repository.worktree )
+    def append_repository( settings ):
+        repositories = settings.get( "repositories" ) or []
+        if not path in [ os.path.normpath( os.path.expanduser( key ) ) for repository in repositories for key in repository ]:
+            repositories.append( { path: {} } )
+        settings["repositories"] = repositories
+    if not path in repository_index():
+        update_settings( append_repository )
+
+def push_remotes( branch, remotes, workers = None ):
+    """Push a branch to several remotes concurrently (i.e. "@master -> @origin @mirror @backup")
 
+    Remotes with the same url are pushed only once, the pushes are reported by
+    helpers.run_concurrently(). Returns the results of the pushes (see messages.failed()).
+
+    Arguments:
+        branch: The name of the branch (i.e. master)
+        remotes: A list with the names of the remotes (i.e. [ "origin", "mirror" ])
+        workers: The number of concurrent pushes, defaults to the "push-workers" setting
+    """
+    repository = find_repository()
+    if not repository:
+        error( "You have not opened a repository" )
+    urls = gitconfig.get_remotes( repository )
+    # The names of all remotes, grouped by their url
+    groups = {}
+    for remote in remotes:
+        groups.setdefault( urls.get( remote, remote ), [] ).append( remote )
+    workers = workers or get_settings().get( "push-workers" ) or len( groups )
+    commands = { ", ".join( names ): [ "git", "-C", repository.worktree, "push", names[0], branch ]
+            for names in groups.values() }
+    return run_concurrently( commands, workers, title = "Remote" )
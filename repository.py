@@ -0,0 +1,193 @@
+#!/bin/env python3
+# Repository
+
+import os, threading
+
+from collections import namedtuple
+
+# worktree: The top-level directory of the working tree
+# gitdir: The git directory of the working tree (contains HEAD and the index)
+# commondir: The git directory which contains the refs and objects (differs
+# from gitdir for worktrees which are created via "git worktree add")
+Repository = namedtuple( "Repository", [ "worktree", "gitdir", "commondir" ] )
+
+# ref: The ref the HEAD points to (i.e. refs/heads/master), None when the HEAD is detached
+# commit: The commit of a detached HEAD, None when the HEAD points to a ref
+Head = namedtuple( "Head", [ "ref", "commit" ] )
+
+_head_cache = {}
+_head_lock = threading.Lock()
+
+def read_gitfile( path ):
+    """Returns the git directory a ".git" file points to
+
+    Worktrees and submodules have a ".git" file instead of a ".git" directory,
+    the file contains a line like "gitdir: ../.git/modules/name".
+
+    Arguments:
+        path: The path to the ".git" file
+    """
+    try:
+        with open( path, "r" ) as file:
+            content = file.readline().strip()
+    except OSError:
+        return None
+    if not content.startswith( "gitdir:" ):
+        return None
+    gitdir = content[len( "gitdir:" ):].strip()
+    return os.path.normpath( os.path.join( os.path.dirname( path ), gitdir ) )
+
+def find_repository( path = None ):
+    """Returns the repository which contains path, None when path is not in a repository
+
+    The directories are walked up from path to the root directory, the first directory
+    which contains a ".git" directory or a ".git" file is the top-level of the repository.
+
+    Arguments:
+        path: The directory from which the repository is searched, defaults to the cwd
+    """
+    try:
+        path = os.path.abspath( path or os.getcwd() )
+    except FileNotFoundError:
+        return None
+    while True:
+        dotgit = os.path.join( path, ".git" )
+        gitdir = None
+        if os.path.isdir( dotgit ):
+            gitdir = dotgit
+        elif os.path.isfile( dotgit ):
+            gitdir = read_gitfile( dotgit )
+        if gitdir and os.path.isfile( os.path.join( gitdir, "HEAD" ) ):
+            return Repository( path, gitdir, read_commondir( gitdir ) )
+        parent = os.path.dirname( path )
+        if parent == path:
+            return None
+        path = parent
+
+def read_commondir( gitdir ):
+    try:
+        with open( os.path.join( gitdir, "commondir" ), "r" ) as file:
+            return os.path.normpath( os.path.join( gitdir, file.readline().strip() ) )
+    except OSError:
+        return gitdir
+
+def resolve_ref( commondir, ref ):
+    """Returns the commit of a ref from the loose refs or the packed-refs file, None when it's unborn"""
+    try:
+        with open( os.path.join( commondir, ref ), "r" ) as file:
+            return file.readline().strip()
+    except OSError:
+        pass
+    try:
+        with open( os.path.join( commondir, "packed-refs" ), "r" ) as file:
+            for line in file:
+                if line.endswith( " " + ref + "\n" ):
+                    return line.split( " ", 1 )[0]
+    except OSError:
+        pass
+    return None
+
+def read_head( repository ):
+    """Returns the parsed HEAD of the repository
+
+    The result is cached and only read again, when the mtime of the HEAD file or of the
+    git directory has changed (git replaces HEAD via a rename in the git directory).
+
+    Arguments:
+        repository: A Repository tuple (see find_repository())
+    """
+    head_path = os.path.join( repository.gitdir, "HEAD" )
+    try:
+        key = ( os.stat( head_path ).st_mtime_ns, os.stat( repository.gitdir ).st_mtime_ns )
+    except OSError:
+        return None
+    with _head_lock:
+        cached = _head_cache.get( repository.gitdir )
+    if cached and cached[0] == key:
+        return cached[1]
+    try:
+        with open( head_path, "r" ) as file:
+            content = file.readline().strip()
+    except OSError:
+        return None
+    if content.startswith( "ref:" ):
+        head = Head( content[len( "ref:" ):].strip(), None )
+    else:
+        head = Head( None, content )
+    with _head_lock:
+        _head_cache[repository.gitdir] = ( key, head )
+    return head
+
+def head_commit( repository ):
+    """Returns the commit the HEAD points to, None for an unborn branch"""
+    head = read_head( repository )
+    if not head:
+        return None
+    if head.ref:
+        return resolve_ref( repository.commondir, head.ref )
+    return head.commit
+
+def describe_head( repository ):
+    """Returns the name of the current branch, or the abbreviated commit when the HEAD is detached"""
+    head = read_head( repository )
+    if not head:
+        return None
+    if head.ref:
+        if head.ref.startswith( "refs/heads/" ):
+            return head.ref[len( "refs/heads/" ):]
+        return head.ref
+    return "(" + head.commit[:7] + ")"
+
+def main_worktree( repository ):
+    """Returns the main working tree of a repository, None when it is unknown (i.e. a bare repository)"""
+    if os.path.realpath( repository.gitdir ) == os.path.realpath( repository.commondir ):
+        return repository.worktree
+    # The git directory of submodules and of "--separate-git-dir" repositories is not
+    # located in their working tree, its "core.worktree" points to the working tree
+    if __package__:
+        from . import gitconfig
+    else:
+        import gitconfig
+    for entry in gitconfig.read_config( os.path.join( repository.commondir, "config" ) ):
+        if entry.section == "core" and entry.subsection is None and entry.key == "worktree":
+            return os.path.normpath( os.path.join( repository.commondir, entry.value ) )
+    if os.path.basename( repository.commondir ) == ".git":
+        return os.path.dirname( repository.commondir )
+    return None
+
+def checked_out( repository, ref ):
+    """Returns the working tree in which ref is checked out as a Repository tuple, None when no
+    working tree has checked it out
+
+    Besides the main working tree, all working trees created via "git worktree add" are checked.
+    The working tree is the repository itself, when its gitdir is the gitdir of repository.
+
+    Arguments:
+        repository: A Repository tuple (see find_repository())
+        ref: The full name of the ref (i.e. refs/heads/master)
+    """
+    # The HEAD of the main working tree is in the commondir, the HEADs of the other working
+    # trees are in ".git/worktrees/<name>", the "gitdir" file there points to their ".git" file
+    gitdirs = [ repository.commondir ]
+    worktrees = os.path.join( repository.commondir, "worktrees" )
+    try:
+        names = os.listdir( worktrees )
+    except OSError:
+        names = []
+    gitdirs += [ os.path.join( worktrees, name ) for name in names ]
+    for gitdir in gitdirs:
+        if os.path.realpath( gitdir ) == os.path.realpath( repository.gitdir ):
+            candidate = repository
+        elif gitdir == repository.commondir:
+            candidate = Repository( main_worktree( repository ), gitdir, repository.commondir )
+        else:
+            try:
+                with open( os.path.join( gitdir, "gitdir" ), "r" ) as file:
+                    worktree = os.path.dirname( file.readline().strip() )
+            except OSError:
+                continue
+            candidate = Repository( worktree, gitdir, repository.commondir )
+        head = read_head( candidate )
+        if head and head.ref == ref:
+            return candidate
+    return None
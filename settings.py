@@ -1,24 +1,235 @@
 #!/bin/env python3
 # Settings
 
-import yaml
+import copy, os, pickle, threading, atexit
 
-from config import config_file
+from contextlib import contextmanager
+
+# Advisory file locks are only available on POSIX systems
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+if __package__:
+    from .config import config_file, settings_snapshot_file
+    from .profiling import span
+else:
+    from config import config_file, settings_snapshot_file
+    from profiling import span
+
+def yaml_module():
+    """Returns the yaml module, the loader and the dumper
+
+    pyYAML is only imported, when the config.yml file needs to be parsed or written (and not
+    when the settings are loaded from the snapshot). The libyaml bindings are used when they
+    are available, they are much faster than the pure-Python implementation of pyYAML.
+    """
+    import yaml
+    try:
+        return yaml, yaml.CSafeLoader, yaml.CSafeDumper
+    except AttributeError:
+        return yaml, yaml.SafeLoader, yaml.SafeDumper
+
+class SettingsStore():
+    """Process wide cache of the config.yml file
+
+    The config.yml file is only parsed again, when its mtime or its size has changed.
+    When the file was parsed, a binary snapshot (pickle) of the settings is written next to
+    the config.yml file, so the next G process can skip parsing the YAML file. The snapshot is
+    only used, when the mtime and the size that are stored in it match the config.yml file.
+    Writing the snapshot can be disabled via "settings-snapshot: false" in the config.yml file.
+
+    Changes are applied via update() as functions, which modify the settings in memory. The
+    changes are written to the config.yml file once at the end of a transaction() or after the
+    debounce interval. The config.yml file is written under an advisory lock: When another G
+    process has changed the file in the meantime, the file is parsed again and the pending
+    changes are applied on top of it. The file is written to a temporary file which replaces the
+    config.yml file, so no process can read a half-written config.yml file.
+    """
+
+    def __init__( self, path = None, snapshot_path = None ):
+        self.path = path or config_file()
+        self.snapshot_path = snapshot_path or settings_snapshot_file()
+        self.settings = None
+        self.key = None
+        self.lock = threading.RLock()
+        self.pending = []
+        self.depth = 0
+        self.timer = None
+        self.debounce = 0.5
+        atexit.register( self.flush )
+
+    def stat( self ):
+        try:
+            stat = os.stat( self.path )
+            return ( stat.st_mtime_ns, stat.st_size )
+        except OSError:
+            return None
+
+    def get( self ):
+        """Returns the cached settings, reloads them when the config.yml file has changed"""
+        with self.lock:
+            key = self.stat()
+            if self.settings is None or key != self.key:
+                self.settings = self.load( key )
+                self.key = key
+                for change in self.pending:
+                    change( self.settings )
+            return self.settings
+
+    def load( self, key ):
+        with span( "settings", "settings snapshot" ):
+            settings = self.load_snapshot( key )
+        if settings is None:
+            with span( "settings", "settings parse" ):
+                settings = self.parse()
+            if settings.get( "settings-snapshot", True ):
+                self.write_snapshot( key, settings )
+        return settings
+
+    def parse( self ):
+        try:
+            with open( self.path, "r" ) as yaml_config:
+                yaml, Loader, Dumper = yaml_module()
+                return yaml.load( yaml_config, Loader = Loader ) or {}
+        except FileNotFoundError:
+            return {}
+
+    def load_snapshot( self, key ):
+        try:
+            with open( self.snapshot_path, "rb" ) as snapshot:
+                snapshot_key, settings = pickle.load( snapshot )
+            if snapshot_key == key:
+                return settings
+        except ( OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError ):
+            pass
+        return None
+
+    def write_snapshot( self, key, settings ):
+        tmp_path = self.snapshot_path + "." + str( os.getpid() ) + ".tmp"
+        try:
+            with open( tmp_path, "wb" ) as snapshot:
+                pickle.dump( ( key, settings ), snapshot, protocol = pickle.HIGHEST_PROTOCOL )
+            os.replace( tmp_path, self.snapshot_path )
+        except OSError:
+            pass
+
+    def update( self, change ):
+        """Apply a change to the settings in memory and schedule writing the config.yml file
+
+        Arguments:
+            change: A function which modifies the settings dictionary, that is passed to it.
+            The function can be applied again, when another process has changed the file.
+        """
+        with self.lock:
+            change( self.get() )
+            self.pending.append( change )
+            if self.depth == 0:
+                self.schedule()
+
+    @contextmanager
+    def transaction( self ):
+        """Collect all changes in this block and write the config.yml file once at the end"""
+        with self.lock:
+            self.depth += 1
+        try:
+            yield self.get()
+        finally:
+            with self.lock:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.flush()
+
+    def schedule( self ):
+        if self.timer:
+            self.timer.cancel()
+        self.timer = threading.Timer( self.settings.get( "settings-debounce", self.debounce ), self.flush )
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush( self ):
+        """Write all pending changes to the config.yml file"""
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            if not self.pending:
+                return
+            with span( "settings", "settings flush" ), self.locked():
+                key = self.stat()
+                if self.settings is None or key != self.key:
+                    settings = self.parse()
+                    for change in self.pending:
+                        change( settings )
+                    self.settings = settings
+                self.write( self.settings )
+            self.pending = []
+
+    @contextmanager
+    def locked( self ):
+        """Hold an advisory lock on the config.yml.lock file"""
+        with open( self.path + ".lock", "a" ) as lock_file:
+            if fcntl:
+                fcntl.flock( lock_file, fcntl.LOCK_EX )
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock( lock_file, fcntl.LOCK_UN )
+
+    def write( self, new_settings ):
+        tmp_path = self.path + ".tmp"
+        yaml, Loader, Dumper = yaml_module()
+        with open( tmp_path, "w" ) as yaml_config:
+            yaml_config.write( yaml.dump( new_settings, Dumper = Dumper, default_flow_style = False ) )
+            yaml_config.flush()
+            os.fsync( yaml_config.fileno() )
+        os.replace( tmp_path, self.path )
+        self.settings = new_settings
+        self.key = self.stat()
+        if new_settings.get( "settings-snapshot", True ):
+            self.write_snapshot( self.key, new_settings )
+
+    def save( self, new_settings ):
+        """Replace all settings by new_settings and write the config.yml file immediately
+
+        Keys which are missing in new_settings are removed. Prefer update() with a narrow change,
+        a replacing change overwrites the changes of other processes.
+        """
+        def replace( settings ):
+            settings.clear()
+            settings.update( copy.deepcopy( new_settings ) )
+        with self.lock:
+            self.update( replace )
+            self.flush()
+
+store = SettingsStore()
 
 def get_settings():
     """Returns a dictionary which contains all settings from the config.yml file"""
-    with open( config_file() , "r" ) as yaml_config:
-        return yaml.load( yaml_config )
+    return store.get()
 
 def save_settings( new_settings ):
     """Store settings via pyYAML in the config.config_file
 
     __Warning__:
-        This function can overwrite the config.yml file, when values are not **appended** to the
-        settings dictionary
+        All settings are replaced, keys which are missing in new_settings are removed and the
+        changes of other G processes are overwritten. Use update_settings() for single values.
 
     Arguments:
         new_settings: Settings that should be written to the config.yml file
     """
-    with open( config_file() , "w" ) as yaml_config:
-        yaml_config.write( yaml.dump( new_settings, default_flow_style = False ) )
+    store.save( new_settings )
+
+def update_settings( change ):
+    """Apply a change to the settings and write them to the config.yml file later
+
+    Arguments:
+        change: A function which modifies the settings dictionary, that is passed to it
+    """
+    store.update( change )
+
+def transaction():
+    """Returns a context manager, which writes all changes in its block at once to the config.yml file"""
+    return store.transaction()
@@ -14,5 +14,5 @@ setup(
     license = "LICENSE.txt",
     packages = [ "G" ],
     include_package_data = True,
-    scripts = [ "G.py" ]
+    scripts = [ "G.py", "client.py" ]
 )
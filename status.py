@@ -0,0 +1,184 @@
+#!/bin/env python3
+# Status
+
+import functools, os, subprocess
+
+from collections import namedtuple
+
+if __package__:
+    from .cli_colors import fg
+    from .helpers import PATHSPEC_THRESHOLD
+else:
+    from cli_colors import fg
+    from helpers import PATHSPEC_THRESHOLD
+
+# kind: "1" (changed), "2" (renamed or copied), "u" (unmerged), "?" (untracked) or "!" (ignored)
+# xy: The staged (x) and the unstaged (y) state, i.e. "M." or "A."
+# path: The path relative to the top-level of the repository
+# orig_path: The path before the rename or copy (only for kind "2")
+Entry = namedtuple( "Entry", [ "kind", "xy", "path", "orig_path" ] )
+
+# The number of space separated fields in front of the path
+FIELDS = { "1": 8, "2": 9, "u": 10, "?": 1, "!": 1 }
+
+GROUPS = [ ( "staged", "Changes to be committed:", fg.green ),
+        ( "unstaged", "Changes not staged for commit:", fg.red ),
+        ( "unmerged", "Unmerged paths:", fg.violett ),
+        ( "untracked", "Untracked files:", fg.red ) ]
+
+STATES = { "M": "modified", "T": "typechange", "A": "new file", "D": "deleted",
+        "R": "renamed", "C": "copied", "U": "unmerged" }
+
+@functools.lru_cache( maxsize = None )
+def fsmonitor_supported():
+    """Returns True when git has a built-in fsmonitor on this platform"""
+    try:
+        process = subprocess.run( [ "git", "fsmonitor--daemon", "status" ],
+                stdout = subprocess.DEVNULL, stderr = subprocess.PIPE )
+    except OSError:
+        return False
+    return not b"not supported" in process.stderr and not b"is not a git command" in process.stderr
+
+def status_command( paths = None, settings = None ):
+    """Returns the arguments of the status command
+
+    With the setting "status-untracked-cache" (defaults to True) git is told to use (and to write)
+    the untracked cache. With "status-fsmonitor: true" the built-in fsmonitor is used, when git
+    supports it on this platform (checking this costs an additional git process).
+
+    Arguments:
+        paths: Limit the status to these paths
+        settings: The settings dictionary
+    """
+    if settings is None:
+        if __package__:
+            from .settings import get_settings
+        else:
+            from settings import get_settings
+        settings = get_settings()
+    args = [ "git" ]
+    if settings.get( "status-untracked-cache", True ):
+        args += [ "-c", "core.untrackedCache=true" ]
+    if settings.get( "status-fsmonitor" ) and fsmonitor_supported():
+        args += [ "-c", "core.fsmonitor=true" ]
+    args += [ "status", "--porcelain=v2", "-z" ]
+    if paths:
+        args += [ "--" ] + list( paths )
+    return args
+
+def parse( stream, chunk_size = 1 << 16 ):
+    """Parse the output of "git status --porcelain=v2 -z" while it is read
+
+    Yields an Entry for every record. The output is read in chunks, so the parsing starts
+    before git has finished.
+
+    Arguments:
+        stream: A binary file object (i.e. the stdout of the git process)
+    """
+    rest = b""
+    pending = None
+    while True:
+        chunk = stream.read( chunk_size )
+        if not chunk:
+            break
+        records = ( rest + chunk ).split( b"\0" )
+        rest = records.pop()
+        for record in records:
+            record = os.fsdecode( record )
+            if pending:
+                # The original path of a rename or copy is a record on its own
+                yield pending._replace( orig_path = record )
+                pending = None
+                continue
+            if not record or record[0] == "#":
+                continue
+            kind = record[0]
+            fields = record.split( " ", FIELDS.get( kind, 1 ) )
+            xy = fields[1] if kind in "12u" else kind * 2
+            entry = Entry( kind, xy, fields[-1], None )
+            if kind == "2":
+                pending = entry
+            else:
+                yield entry
+
+def get_status( paths = None, settings = None, cwd = None, env = None ):
+    """Returns a list of Entry tuples for the repository in cwd
+
+    Arguments:
+        paths: Limit the status to these paths
+        settings: The settings dictionary
+        cwd: The directory of the repository, defaults to the current working directory
+        env: A dictionary of environment variables for git, in addition to the environment of G
+    """
+    process = subprocess.Popen( status_command( paths, settings ), stdout = subprocess.PIPE, cwd = cwd,
+            env = dict( os.environ, **env ) if env else None )
+    try:
+        entries = list( parse( process.stdout ) )
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError( returncode, process.args )
+    return entries
+
+def group( entries ):
+    """Returns a dictionary, which groups the entries into staged, unstaged, unmerged and untracked"""
+    groups = { "staged": [], "unstaged": [], "unmerged": [], "untracked": [] }
+    for entry in entries:
+        if entry.kind == "u":
+            groups["unmerged"].append( entry )
+        elif entry.kind == "?":
+            groups["untracked"].append( entry )
+        elif entry.kind in "12":
+            if entry.xy[0] != ".":
+                groups["staged"].append( entry )
+            if entry.xy[1] != ".":
+                groups["unstaged"].append( entry )
+    return groups
+
+def render( entries ):
+    """Returns the grouped and colored status as a list of lines"""
+    groups = group( entries )
+    lines = []
+    for name, title, color in GROUPS:
+        if not groups[name]:
+            continue
+        lines.append( title )
+        for entry in groups[name]:
+            state = ""
+            if name == "staged":
+                state = STATES.get( entry.xy[0], "" )
+            elif name == "unstaged":
+                state = STATES.get( entry.xy[1], "" )
+            elif name == "unmerged":
+                state = "both modified" if entry.xy == "UU" else entry.xy
+            path = entry.path
+            if entry.orig_path and name == "staged":
+                path = entry.orig_path + " -> " + entry.path
+            lines.append( "  " + color( ( ( state + ":" ).ljust( 14 ) if state else "" ) + path ) )
+    return lines
+
+def changed_pathspecs( paths ):
+    """Returns the pathspecs which cover the changed paths
+
+    When there are too many paths, the status is limited to their directories, or
+    it is not limited at all (None).
+    """
+    if len( paths ) <= PATHSPEC_THRESHOLD:
+        return paths
+    directories = sorted( set( os.path.dirname( path ) or "." for path in paths ) )
+    if len( directories ) <= PATHSPEC_THRESHOLD and not "." in directories:
+        return directories
+    return None
+
+def show_status( paths = None ):
+    """Print the grouped and colored status
+
+    Arguments:
+        paths: Only show these paths (i.e. the paths which were added or reset)
+    """
+    lines = render( get_status( changed_pathspecs( paths ) if paths else None ) )
+    if lines:
+        print( "\n".join( lines ) )
+    elif not paths:
+        print( fg.green( "Nothing to commit, working tree clean" ) )
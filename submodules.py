@@ -1,21 +1,32 @@
 #!/bin/env python3
 # Submodules
 
-import os, threading
+import os, json, subprocess, threading
 
-from settings import get_settings, save_settings
+from concurrent.futures import ThreadPoolExecutor
+
+import gitconfig, index
+
+from config import submodule_tips_file
+from settings import get_settings, transaction, update_settings
 from cli_colors import fg
-from helpers import git
+from helpers import run_concurrently
+from messages import error, success, warning
+from repository import find_repository, resolve_ref
 
-def get_submodules( settings = get_settings() ):
+# The branch of the submodules which is pulled
+UPSTREAM_BRANCH = "master"
+
+def get_submodules( settings = None ):
     """Returns a list of all submodules """
+    settings = settings or get_settings()
     submodules = settings.get( "submodules" )
     if not submodules:
         return False
     else:
         return submodules
 
-def add_submodule( path, ignore_dirty = True, verbose = False, settings = get_settings() ):
+def add_submodule( path, ignore_dirty = True, verbose = False, settings = None ):
     """Add a submodule to the list of submodules in the config.yml file
 
     Arguments:
@@ -23,6 +34,7 @@ def add_submodule( path, ignore_dirty = True, verbose = False, settings = get_se
         ignore_dirty: If the changes to the submodules should NOT be ignored, then set this to False
         verbose: Don't show error messages, when this value is set to True.
     """
+    settings = settings or get_settings()
     try:
         ignored_submodules = [ os.path.expanduser( module ) for module in settings.get( "ignore-submodules" ) ]
         if os.path.expanduser( path ) in ignored_submodules:
@@ -30,15 +42,15 @@ def add_submodule( path, ignore_dirty = True, verbose = False, settings = get_se
                 error( "You want to add a ignored submodule" )
     except:
         pass
-    if not settings.get( "submodules" ):
-        settings["submodules"] = []
-    submodules = settings.get( "submodules" )
-    try:
+    def append_submodule( settings ):
+        submodules = settings.get( "submodules" ) or []
         if not path in [ list( submodule.keys() )[0] for submodule in submodules ]:
             submodules.append( { path: { "ignore_dirty": ignore_dirty } } )
-            save_settings( settings )
+        settings["submodules"] = submodules
+    try:
+        if not path in [ list( submodule.keys() )[0] for submodule in settings.get( "submodules" ) or [] ]:
+            update_settings( append_submodule )
         else:
-            settings["submodules"] = None
             if not verbose:
                 warning( "You added the submodule with the path \"" + path + "\" already to G" )
     except TypeError:
@@ -53,39 +65,132 @@ def show_submodules():
     else:
         warning( "You have not added submodules to the config.config_file \"" + config.file() + "\"" )
 
-def find_submodules( dir = os.path.expanduser( "~" ), settings = get_settings() ):
+def find_submodules( settings = None, full = False ):
     """Search for submodules
 
+    The ".gitmodules" files are looked up in the repository index, which is rescanned
+    incrementally (see index.scan()).
+
     Arguments:
-        dir: The directory from which the function searches for submodules
+        settings: The settings dictionary, which contains the roots of the index
+        full: Rebuild the repository index from scratch
     """
-    ignored_submodules = settings.get( "ignore-submodules" )
-    if get_submodules():
-        submodules = [ submodule for submodule in settings.get( "submodules" ) ]
-    for dirpath, dirnames, filenames in os.walk( dir ):
-        for file in filenames:
-            if file == ".gitmodules":
-                submodules.append( os.path.expanduser( os.path.join( dirpath, file ) ) )
-    for submodule in submodules:
-        if submodule in ignored_submodules:
-            submodules.remove( submodule )
-    for submodule in submodules:
-        add_submodule( submodule, verbose = True )
+    settings = settings or get_settings()
+    ignored_submodules = [ os.path.expanduser( module ) for module in settings.get( "ignore-submodules" ) or [] ]
+    submodules = [ submodule for submodule in index.scan( settings, full = full ).gitmodules()
+            if not submodule in ignored_submodules ]
+    # Write the config.yml file only once for all found submodules
+    with transaction():
+        for submodule in submodules:
+            add_submodule( submodule, verbose = True )
     return submodules
 
+def reindex():
+    """Rebuild the repository index from scratch and show the number of found submodules"""
+    submodules = find_submodules( full = True )
+    success( "Indexed " + str( len( submodules ) ) + " submodules" )
+
 def ignore_submodule( path_to_submodule ):
     """Ignore a specific path to a submodule which will be ignored by "G"
 
     Arguments:
         path_to_submodule: A path to a submodule which should be ignored by "G"
     """
-    ignored_submodules = [ os.path.expanduser( module ) for module in settings.get( "ignore-submodules" ) ]
-    if not path_to_submodule in ignored_submodules:
-        ignored_submodules.append( os.expanduser( path_to_submodule ) )
-    save_settings( settings )
-
-def update_submodules( submodules = get_settings().get( "submodules" ) ):
-    for submodule in submodules:
-        path_to_submodule = os.path.dirname( list( submodule.keys() )[0] )
-        os.chdir( path_to_submodule )
-        git( "submodule", "foreach git pull origin master" )
+    path_to_submodule = os.path.expanduser( path_to_submodule )
+    def append_ignored( settings ):
+        ignored_submodules = settings.get( "ignore-submodules" ) or []
+        if not path_to_submodule in [ os.path.expanduser( module ) for module in ignored_submodules ]:
+            ignored_submodules.append( path_to_submodule )
+        settings["ignore-submodules"] = ignored_submodules
+    update_settings( append_ignored )
+
+def submodule_remotes( path ):
+    """Returns a dictionary of the paths of all submodules of a repository and the urls of their "origin"
+
+    The url is None, when it is unknown (i.e. a relative url of a submodule, which is not
+    checked out).
+
+    Arguments:
+        path: The path to the repository which contains the submodules
+    """
+    remotes = {}
+    for entry in gitconfig.read_config( os.path.join( path, ".gitmodules" ) ):
+        if entry.section == "submodule" and entry.key == "path":
+            submodule_path = os.path.normpath( os.path.join( path, entry.value ) )
+            repository = find_repository( submodule_path )
+            url = None
+            if repository and os.path.normpath( repository.worktree ) == submodule_path:
+                url = gitconfig.get_remotes( repository ).get( "origin" )
+            remotes[submodule_path] = url
+    return remotes
+
+def ls_remote( url ):
+    """Returns the sha of the upstream branch of a remote, None when the remote can not be read"""
+    try:
+        process = subprocess.run( [ "git", "ls-remote", url, "refs/heads/" + UPSTREAM_BRANCH ],
+                stdout = subprocess.PIPE, stderr = subprocess.DEVNULL )
+    except OSError:
+        return None
+    output = process.stdout.decode( "utf-8", "replace" ).split()
+    return output[0] if process.returncode == 0 and output else None
+
+def load_tips():
+    """Returns the tips of the upstream branches, which were pulled last, keyed on the submodule paths"""
+    try:
+        with open( submodule_tips_file(), "r" ) as file:
+            return json.load( file )
+    except ( OSError, ValueError ):
+        return {}
+
+def save_tips( tips ):
+    path = submodule_tips_file()
+    with open( path + ".tmp", "w" ) as file:
+        json.dump( tips, file, indent = 1, sort_keys = True )
+    os.replace( path + ".tmp", path )
+
+def local_tip( path ):
+    """Returns the sha of the remote-tracking branch of the upstream in a submodule"""
+    repository = find_repository( path )
+    if repository:
+        return resolve_ref( repository.commondir, "refs/remotes/origin/" + UPSTREAM_BRANCH )
+
+def update_submodules( submodules = None, workers = None, force = False ):
+    """Pull the submodules of all registered repositories concurrently
+
+    Before the submodules are pulled, the tip of the upstream branch of every remote is
+    looked up via "git ls-remote" (once per url, even when several submodules share it).
+    A repository is skipped, when the tips of all its submodules are the same as the tips,
+    which were pulled last (see load_tips()). The pulls are reported by helpers.run_concurrently().
+
+    Arguments:
+        submodules: The list of submodules from the config.yml file
+        workers: The number of concurrent pulls, defaults to the "update-workers" setting
+        force: Pull all submodules, even when their remotes have not changed
+    """
+    settings = get_settings()
+    if submodules is None:
+        submodules = settings.get( "submodules" )
+    paths = [ os.path.dirname( os.path.expanduser( list( submodule.keys() )[0] ) ) for submodule in submodules or [] ]
+    workers = workers or settings.get( "update-workers" ) or 8
+    tips = load_tips()
+    remotes = { path: submodule_remotes( path ) for path in paths }
+    if force:
+        pending = paths
+    else:
+        urls = sorted( set( url for path in paths for url in remotes[path].values() if url ) )
+        with ThreadPoolExecutor( max_workers = workers ) as pool:
+            remote_tips = dict( zip( urls, pool.map( ls_remote, urls ) ) )
+        # A repository is pulled, when the tip of one submodule is unknown or has changed
+        pending = [ path for path in paths if any( not url or not remote_tips[url] or tips.get( submodule ) != remote_tips[url]
+            for submodule, url in remotes[path].items() ) ]
+    if len( pending ) < len( paths ):
+        success( str( len( paths ) - len( pending ) ) + " of " + str( len( paths ) ) + " repositories are up to date" )
+    def pulled( path, returncode ):
+        if returncode == 0:
+            for submodule in remotes[path]:
+                tips[submodule] = local_tip( submodule )
+    results = run_concurrently( { path: [ "git", "-C", path, "submodule", "foreach", "git pull origin " + UPSTREAM_BRANCH ]
+        for path in pending }, workers, finished = pulled )
+    if results:
+        save_tips( tips )
+    return results
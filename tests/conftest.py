@@ -0,0 +1,28 @@
+#!/bin/env python3
+# The modules of G import each other as top-level modules
+
+import atexit, os, shutil, subprocess, sys, tempfile
+
+import pytest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+# Like benchmarks/bench_suite.py: HOME and the global git config point into a temporary
+# directory, before any module of G is imported (settings.py creates ~/.config/G on import)
+_workdir = tempfile.mkdtemp( prefix = "G-tests-" )
+atexit.register( shutil.rmtree, _workdir, True )
+os.makedirs( os.path.join( _workdir, "home" ) )
+with open( os.path.join( _workdir, "gitconfig" ), "w" ) as file:
+    file.write( "[user]\n\tname = G\n\temail = G@localhost\n[init]\n\tdefaultBranch = master\n"
+            "[protocol \"file\"]\n\tallow = always\n" )
+os.environ.update( HOME = os.path.join( _workdir, "home" ), GIT_CONFIG_GLOBAL = os.path.join( _workdir, "gitconfig" ),
+        GIT_CONFIG_NOSYSTEM = "1", GIT_TERMINAL_PROMPT = "0" )
+
+@pytest.fixture
+def git():
+    """Returns a function, which runs git and returns its stripped output"""
+    def run( *args, cwd = None ):
+        process = subprocess.run( [ "git" ] + [ str( arg ) for arg in args ], cwd = cwd, check = True,
+                stdout = subprocess.PIPE, stderr = subprocess.PIPE )
+        return process.stdout.decode( "utf-8" ).strip()
+    return run
@@ -0,0 +1,59 @@
+#!/bin/env python3
+# Tests of the batch mode
+
+import os, subprocess, sys
+
+from batch import read_commands, run_batch
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+def execute( executed ):
+    """Returns a G.main() replacement, which records the commands and fails like G"""
+    def main( args ):
+        executed.append( " ".join( args ) )
+        if args[0] == "fail":
+            return False
+        if args[0] == "exit":
+            sys.exit( int( args[1] ) )
+        if args[0] == "git":
+            raise subprocess.CalledProcessError( 128, args )
+        if args[0] == "raise":
+            raise RuntimeError( "broken" )
+    return main
+
+def test_read_commands( tmp_path ):
+    ( tmp_path / "commands" ).write_text( "# a comment\n+ file\n\n  @master -> @origin  \n" )
+    assert read_commands( str( tmp_path / "commands" ) ) == [ "+ file", "@master -> @origin" ]
+
+def test_stop_at_the_first_failure( capsys ):
+    executed = []
+    assert run_batch( [ "ok", "fail", "ok again" ], execute( executed ) ) == 1
+    assert executed == [ "ok", "fail" ]
+    assert "1 commands were not executed" in capsys.readouterr().out
+
+def test_exit_codes():
+    for command, code in ( ( "exit 3", 3 ), ( "git", 128 ), ( "raise", 1 ) ):
+        executed = []
+        assert run_batch( [ "ok", command, "ok" ], execute( executed ) ) == code
+        assert executed == [ "ok", command ]
+
+def test_keep_going_returns_the_first_failure():
+    executed = []
+    assert run_batch( [ "exit 3", "ok", "fail" ], execute( executed ), keep_going = True ) == 3
+    assert executed == [ "exit 3", "ok", "fail" ]
+    assert run_batch( [ "ok", "ok" ], execute( [] ) ) == 0
+
+def test_batch_mode_of_G( tmp_path, git ):
+    repository = tmp_path / "repository"
+    git( "init", "-q", repository )
+    ( repository / "file" ).write_text( "" )
+    ( tmp_path / "commands" ).write_text( "+ file\nunknown command\n- file\n" )
+    def batch( *args ):
+        return subprocess.run( [ sys.executable, os.path.join( ROOT, "G.py" ), "--batch", str( tmp_path / "commands" ) ] +
+                list( args ), cwd = repository, stdout = subprocess.PIPE, stderr = subprocess.STDOUT )
+    # The unknown command stops the batch, the file stays added
+    assert batch().returncode == 1
+    assert git( "status", "--porcelain", cwd = repository ) == "A  file"
+    # With --keep-going the file is reset again, but the exit code still reports the failure
+    assert batch( "--keep-going" ).returncode == 1
+    assert git( "status", "--porcelain", cwd = repository ) == "?? file"
@@ -0,0 +1,45 @@
+#!/bin/env python3
+# Tests of the command parser
+
+import pytest
+
+from command import Plan, parse, tokenize
+
+def test_repeated_filenames():
+    # The old parser looked up the arguments via args.index() and lost the repeated ones
+    assert parse( "+ a.txt b.txt a.txt a.txt" ) == Plan( "add", [], [ "a.txt", "b.txt", "a.txt", "a.txt" ] )
+    assert parse( [ "-", "x", "x" ] ) == Plan( "reset", [], [ "x", "x" ] )
+
+def test_prefix_operator_discards_arguments():
+    assert parse( "foo + file -> other" ) == Plan( "add", [], [ "file", "other" ] )
+
+def test_first_infix_operator_wins():
+    plan = parse( "@master -> @origin @mirror" )
+    assert plan == Plan( "push", [ "@master" ], [ "@origin", "@mirror" ] )
+    assert plan.arguments == [ "@master", "@origin", "@mirror" ]
+    assert parse( "@a > @b -> @c" ) == Plan( "merge", [ "@a" ], [ "@b", "@c" ] )
+
+def test_variables_are_required_for_push_and_merge():
+    with pytest.raises( ValueError ):
+        parse( "master -> origin" )
+    with pytest.raises( ValueError ):
+        parse( "@master > feature" )
+
+def test_push_needs_exactly_one_branch():
+    with pytest.raises( ValueError ):
+        parse( "@a @b -> @origin" )
+    with pytest.raises( ValueError ):
+        parse( "-> @origin" )
+    assert parse( "@master ->" ) == Plan( "push", [ "@master" ], [] )
+
+def test_no_operator():
+    assert parse( "" ) == Plan( None, [], [] )
+    assert parse( "status" ) == Plan( None, [ "status" ], [] )
+
+def test_tokenize():
+    assert [ token.kind for token in tokenize( "+ @file:list.txt @master dir/file.txt -x" ) ] == [
+            "operator", "manifest", "variable", "path", "word" ]
+
+def test_large_input():
+    args = [ "+" ] + [ "file" + str( i % 100 ) for i in range( 100000 ) ]
+    assert parse( args ).targets == args[1:]
@@ -0,0 +1,74 @@
+#!/bin/env python3
+# Tests of the git config reader
+
+import os
+
+import gitconfig
+
+from repository import Repository
+
+def write( path, content ):
+    with open( path, "w" ) as file:
+        file.write( content )
+    return str( path )
+
+def repository_at( path ):
+    gitdir = os.path.join( str( path ), ".git" )
+    os.makedirs( gitdir, exist_ok = True )
+    return Repository( str( path ), gitdir, gitdir )
+
+def values( entries, section, key, subsection = None ):
+    return [ entry.value for entry in entries
+            if entry.section == section and entry.subsection == subsection and entry.key == key ]
+
+def test_quoting_and_comments():
+    assert gitconfig.parse_value( 'plain value ; comment' ) == ( "plain value", False )
+    assert gitconfig.parse_value( '"  quoted # not a comment  "' ) == ( "  quoted # not a comment  ", False )
+    assert gitconfig.parse_value( 'a "b ; c" d # comment' ) == ( "a b ; c d", False )
+
+def test_escapes():
+    assert gitconfig.parse_value( r'"tab\there" \"x\" back\\slash' ) == ( 'tab\there "x" back\\slash', False )
+    assert gitconfig.parse_value( r'line\nbreak' ) == ( "line\nbreak", False )
+
+def test_continuation( tmp_path ):
+    path = write( tmp_path / "config", '[alias]\n\tlg = log \\\n\t--oneline \\\n\t--graph\n\tst = status\n' )
+    entries = gitconfig.read_config( path )
+    # Like git, the whitespace in front of the continued lines is kept as spaces
+    assert values( entries, "alias", "lg" ) == [ "log  --oneline  --graph" ]
+    assert values( entries, "alias", "st" ) == [ "status" ]
+
+def test_sections_and_booleans( tmp_path ):
+    path = write( tmp_path / "config", '[Core]\n\tBare\n[remote "Origin \\"x\\""]\n\turl = /a\n'
+            '[branch.Main]\n\tremote = origin\n[user] name = G\n' )
+    entries = gitconfig.read_config( path )
+    assert values( entries, "core", "bare" ) == [ "true" ]
+    assert values( entries, "remote", "url", 'Origin "x"' ) == [ "/a" ]
+    assert values( entries, "branch", "remote", "main" ) == [ "origin" ]
+    assert values( entries, "user", "name" ) == [ "G" ]
+
+def test_include_if_gitdir( tmp_path ):
+    work = repository_at( tmp_path / "work" / "project" )
+    other = repository_at( tmp_path / "other" )
+    write( tmp_path / "work.conf", "[user]\n\temail = work@example.com\n" )
+    path = write( tmp_path / "config", '[user]\n\temail = home@example.com\n'
+            '[includeIf "gitdir:' + str( tmp_path / "work" ) + '/"]\n\tpath = work.conf\n'
+            '[includeIf "gitdir/i:' + str( tmp_path / "WORK" ).upper() + '/"]\n\tpath = work.conf\n' )
+    assert values( gitconfig.read_config( path, work ), "user", "email" ) == [ "home@example.com",
+            "work@example.com", "work@example.com" ]
+    assert values( gitconfig.read_config( path, other ), "user", "email" ) == [ "home@example.com" ]
+    # Without a repository, no condition is met
+    assert values( gitconfig.read_config( path ), "user", "email" ) == [ "home@example.com" ]
+
+def test_include_if_relative_gitdir( tmp_path ):
+    repository = repository_at( tmp_path / "a" / "project" )
+    write( tmp_path / "extra.conf", "[core]\n\tautocrlf = input\n" )
+    path = write( tmp_path / "config", '[includeIf "gitdir:project/"]\n\tpath = extra.conf\n'
+            '[includeIf "gitdir:./a/"]\n\tpath = extra.conf\n' )
+    assert values( gitconfig.read_config( path, repository ), "core", "autocrlf" ) == [ "input", "input" ]
+
+def test_include_depth( tmp_path ):
+    # A file which includes itself stops at the depth limit of git
+    path = write( tmp_path / "config", "[include]\n\tpath = config\n" )
+    files = []
+    gitconfig.read_config( path, files = files )
+    assert len( files ) == gitconfig.MAX_INCLUDE_DEPTH + 1
@@ -0,0 +1,46 @@
+#!/bin/env python3
+# Tests of the history
+
+from history import COMPACT_FACTOR, HistoryStore
+
+def lines_of( path ):
+    with open( path, "r" ) as file:
+        return file.read().splitlines()
+
+def test_ring_buffer( tmp_path ):
+    history = HistoryStore( str( tmp_path / "history" ), length = 3 )
+    for entry in [ "a", "b", "c", "a", "d", "  ", "x\ny" ]:
+        history.append( entry )
+    # "a" was moved to the end, "b" was dropped as the oldest command, empty and multi-line
+    # commands are not remembered
+    assert history.list() == [ "c", "a", "d" ]
+
+def test_history_is_read_again( tmp_path ):
+    path = str( tmp_path / "history" )
+    ( tmp_path / "history" ).write_text( "a\nb\na\n\nc\n" )
+    assert HistoryStore( path, length = 10 ).list() == [ "b", "a", "c" ]
+    assert HistoryStore( path, length = 2 ).list() == [ "a", "c" ]
+
+def test_compaction( tmp_path ):
+    path = str( tmp_path / "history" )
+    history = HistoryStore( path, length = 3 )
+    for entry in [ "a", "b", "a", "b", "a", "b" ]:
+        history.append( entry )
+    # The file is only appended to, until it exceeds the threshold
+    assert lines_of( path ) == [ "a", "b", "a", "b", "a", "b" ]
+    history.append( "c" )
+    assert len( lines_of( path ) ) < 3 * COMPACT_FACTOR
+    assert lines_of( path ) == [ "a", "b", "c" ]
+    history.append( "a" )
+    assert lines_of( path ) == [ "a", "b", "c", "a" ]
+    history.compact( force = True )
+    assert lines_of( path ) == [ "b", "c", "a" ]
+
+def test_compaction_keeps_the_commands_of_other_processes( tmp_path ):
+    path = str( tmp_path / "history" )
+    first = HistoryStore( path, length = 5 )
+    second = HistoryStore( path, length = 5 )
+    first.append( "first" )
+    second.append( "second" )
+    first.compact( force = True )
+    assert lines_of( path ) == [ "first", "second" ]
@@ -0,0 +1,93 @@
+#!/bin/env python3
+# Tests of the merge without a checkout
+
+import subprocess
+
+import pytest
+
+from helpers import git_version
+from merge import merge_refs
+from repository import find_repository
+
+pytestmark = pytest.mark.skipif( git_version() < ( 2, 38 ), reason = "git merge-tree --write-tree needs git 2.38" )
+
+def commit( git, path, name, content = None ):
+    ( path / name ).write_text( ( content or name ) + "\n" )
+    git( "add", name, cwd = path )
+    git( "commit", "-q", "-m", name, cwd = path )
+    return git( "rev-parse", "HEAD", cwd = path )
+
+@pytest.fixture
+def repository( tmp_path, git ):
+    """A repository with master checked out and the branches target and source (from base)"""
+    git( "init", "-q", tmp_path )
+    commit( git, tmp_path, "base" )
+    git( "branch", "target", cwd = tmp_path )
+    git( "branch", "source", cwd = tmp_path )
+    return find_repository( str( tmp_path ) )
+
+def on_branch( git, path, branch, *commits ):
+    git( "checkout", "-q", branch, cwd = path )
+    tips = [ commit( git, path, *arguments ) for arguments in commits ]
+    git( "checkout", "-q", "master", cwd = path )
+    return tips[-1]
+
+def test_fast_forward( repository, tmp_path, git ):
+    tip = on_branch( git, tmp_path, "source", ( "new", ) )
+    merge = merge_refs( repository, "target", "source" )
+    assert ( merge.state, merge.commit ) == ( "fast-forward", tip )
+    assert git( "rev-parse", "target", cwd = tmp_path ) == tip
+    # The working tree and the current branch are not touched
+    assert git( "status", "--porcelain", cwd = tmp_path ) == ""
+    assert not ( tmp_path / "new" ).exists()
+    assert "Fast-forward" in git( "reflog", "-1", "target", cwd = tmp_path )
+
+def test_merge_commit( repository, tmp_path, git ):
+    ours = on_branch( git, tmp_path, "target", ( "ours", ) )
+    theirs = on_branch( git, tmp_path, "source", ( "theirs", ) )
+    merge = merge_refs( repository, "target", "source" )
+    assert merge.state == "merged"
+    assert git( "rev-parse", "target", cwd = tmp_path ) == merge.commit
+    assert git( "rev-parse", "target^1", "target^2", cwd = tmp_path ).split() == [ ours, theirs ]
+    assert git( "ls-tree", "--name-only", "target", cwd = tmp_path ).split() == [ "base", "ours", "theirs" ]
+    assert git( "log", "-1", "--format=%s", "target", cwd = tmp_path ) == "Merge branch 'source' into target"
+
+def test_up_to_date( repository, tmp_path, git ):
+    tip = on_branch( git, tmp_path, "target", ( "ours", ) )
+    merge = merge_refs( repository, "target", "source" )
+    assert ( merge.state, merge.commit ) == ( "up-to-date", None )
+    assert git( "rev-parse", "target", cwd = tmp_path ) == tip
+
+def test_conflict_changes_nothing( repository, tmp_path, git ):
+    tip = on_branch( git, tmp_path, "target", ( "file", "ours" ) )
+    on_branch( git, tmp_path, "source", ( "file", "theirs" ) )
+    merge = merge_refs( repository, "target", "source" )
+    assert ( merge.state, merge.commit ) == ( "conflict", None )
+    assert merge.result.conflicts == [ "file" ]
+    assert any( "CONFLICT" in message for message in merge.result.messages )
+    assert git( "rev-parse", "target", cwd = tmp_path ) == tip
+
+def test_current_branch_is_left_to_git_merge( repository, tmp_path, git ):
+    head = git( "rev-parse", "master", cwd = tmp_path )
+    on_branch( git, tmp_path, "source", ( "new", ) )
+    merge = merge_refs( repository, "master", "source" )
+    assert ( merge.state, merge.worktree ) == ( "current", str( tmp_path ) )
+    assert git( "rev-parse", "master", cwd = tmp_path ) == head
+
+def test_branch_checked_out_in_another_worktree( repository, tmp_path, git ):
+    tip = git( "rev-parse", "target", cwd = tmp_path )
+    on_branch( git, tmp_path, "source", ( "new", ) )
+    git( "worktree", "add", "-q", tmp_path / "other", "target", cwd = tmp_path )
+    merge = merge_refs( repository, "target", "source" )
+    assert merge.state == "checked-out"
+    assert git( "rev-parse", "target", cwd = tmp_path ) == tip
+    # Seen from the other working tree, the main working tree is "checked-out"
+    other = find_repository( str( tmp_path / "other" ) )
+    assert merge_refs( other, "master", "source" ).state == "checked-out"
+    assert merge_refs( other, "target", "source" ).state == "current"
+
+def test_unknown_source( repository, tmp_path, git ):
+    with pytest.raises( subprocess.CalledProcessError ):
+        merge_refs( repository, "target", "unknown" )
+    with pytest.raises( subprocess.CalledProcessError ):
+        merge_refs( repository, "unknown", "source" )
@@ -0,0 +1,33 @@
+#!/bin/env python3
+# Tests of the process spans
+
+import subprocess, sys, time
+
+import profiling
+
+def spans_of( process ):
+    return [ span for span in profiling.spans() if span.argv == [ str( arg ) for arg in process.args ] ]
+
+def test_wait_records_the_process():
+    process = profiling.TracedPopen( [ sys.executable, "-c", "import sys; sys.exit( 3 )" ] )
+    assert process.wait() == 3
+    spans = spans_of( process )
+    assert len( spans ) == 1
+    assert spans[0].returncode == 3 and spans[0].cpu is not None and spans[0].category == "process"
+
+def test_poll_records_the_process():
+    process = profiling.TracedPopen( [ "git", "version" ], stdout = subprocess.DEVNULL )
+    while process.poll() is None:
+        time.sleep( 0.01 )
+    assert process.wait() == 0
+    spans = spans_of( process )
+    assert len( spans ) == 1
+    assert spans[0].name == "git version" and spans[0].returncode == 0 and spans[0].cpu is not None
+
+def test_communicate_and_timeout():
+    process = profiling.TracedPopen( [ sys.executable, "-c", "print( 1 )" ], stdout = subprocess.PIPE )
+    assert process.communicate()[0].strip() == b"1"
+    assert [ span.returncode for span in spans_of( process ) ] == [ 0 ]
+    process = profiling.TracedPopen( [ sys.executable, "-c", "import time; time.sleep( 0.2 )" ] )
+    assert process.wait( timeout = 5 ) == 0
+    assert [ span.returncode for span in spans_of( process ) ] == [ 0 ]
@@ -0,0 +1,62 @@
+#!/bin/env python3
+# Tests of the settings store
+
+import os, subprocess, sys
+
+from settings import SettingsStore
+
+ROOT = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+def store_in( tmp_path ):
+    return SettingsStore( str( tmp_path / "config.yml" ), str( tmp_path / "config.cache" ) )
+
+def test_changes_of_other_stores_are_kept( tmp_path ):
+    first = store_in( tmp_path )
+    second = store_in( tmp_path )
+    assert first.get() == {}
+    second.update( lambda settings: settings.__setitem__( "x", 1 ) )
+    second.flush()
+    # The change is applied again on top of the file, which the other store has written
+    first.update( lambda settings: settings.__setitem__( "y", 2 ) )
+    first.flush()
+    assert store_in( tmp_path ).get() == { "x": 1, "y": 2 }
+    assert second.get() == { "x": 1, "y": 2 }
+
+def test_transaction_writes_once( tmp_path ):
+    store = store_in( tmp_path )
+    with store.transaction() as settings:
+        store.update( lambda settings: settings.__setitem__( "a", 1 ) )
+        store.update( lambda settings: settings.__setitem__( "b", 2 ) )
+        assert not os.path.exists( tmp_path / "config.yml" )
+    assert store_in( tmp_path ).get() == { "a": 1, "b": 2 }
+
+def test_save_replaces_the_settings( tmp_path ):
+    store = store_in( tmp_path )
+    store.save( { "a": 1, "b": { "c": 2 } } )
+    store.save( { "a": 1 } )
+    assert store_in( tmp_path ).get() == { "a": 1 }
+
+def test_snapshot( tmp_path ):
+    store_in( tmp_path ).save( { "a": [ 1, 2 ] } )
+    assert os.path.exists( tmp_path / "config.cache" )
+    store = store_in( tmp_path )
+    # The snapshot is used, as long as the config.yml file has not changed
+    store.parse = None
+    assert store.get() == { "a": [ 1, 2 ] }
+
+def test_concurrent_processes_do_not_lose_updates( tmp_path ):
+    # Every process increments the counter, the advisory lock and the re-applied changes
+    # make sure, that no increment is lost
+    script = """
+import sys
+sys.path.insert( 0, sys.argv[1] )
+from settings import SettingsStore
+store = SettingsStore( sys.argv[2], sys.argv[3] )
+for _ in range( 20 ):
+    store.update( lambda settings: settings.__setitem__( "counter", settings.get( "counter", 0 ) + 1 ) )
+    store.flush()
+"""
+    processes = [ subprocess.Popen( [ sys.executable, "-c", script, ROOT, str( tmp_path / "config.yml" ),
+        str( tmp_path / ( "config" + str( i ) + ".cache" ) ) ] ) for i in range( 4 ) ]
+    assert [ process.wait() for process in processes ] == [ 0, 0, 0, 0 ]
+    assert store_in( tmp_path ).get() == { "counter": 80 }
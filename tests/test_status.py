@@ -0,0 +1,70 @@
+#!/bin/env python3
+# Tests of the status parser
+
+import io
+
+import status
+
+# A modified file, a rename (the original path is a record on its own) and an untracked file
+OUTPUT = ( b"# branch.oid 0123\0"
+        b"1 .M N... 100644 100644 100644 1111 1111 dir/changed file.txt\0"
+        b"2 R. N... 100644 100644 100644 2222 2222 R100 new name.txt\0old name.txt\0"
+        b"? untracked.txt\0" )
+
+EXPECTED = [ status.Entry( "1", ".M", "dir/changed file.txt", None ),
+        status.Entry( "2", "R.", "new name.txt", "old name.txt" ),
+        status.Entry( "?", "??", "untracked.txt", None ) ]
+
+def test_parse():
+    assert list( status.parse( io.BytesIO( OUTPUT ) ) ) == EXPECTED
+
+def test_parse_records_split_across_chunks():
+    # Every split of the output, including those in the middle of the rename and between
+    # the rename and its original path, must give the same entries
+    for chunk_size in range( 1, 64 ):
+        assert list( status.parse( io.BytesIO( OUTPUT ), chunk_size ) ) == EXPECTED
+
+def test_parse_rename_split_at_original_path():
+    position = OUTPUT.index( b"old name.txt" )
+    for split in ( position - 1, position, position + 3 ):
+        class Stream():
+            def __init__( self ):
+                self.chunks = [ OUTPUT[:split], OUTPUT[split:] ]
+            def read( self, size ):
+                return self.chunks.pop( 0 ) if self.chunks else b""
+        assert list( status.parse( Stream() ) ) == EXPECTED
+
+def test_parse_undecodable_path():
+    entries = list( status.parse( io.BytesIO( b"? caf\xe9.txt\0" ) ) )
+    assert entries[0].path.encode( "utf-8", "surrogateescape" ) == b"caf\xe9.txt"
+
+def test_get_status( tmp_path, git ):
+    git( "init", "-q", tmp_path )
+    for name in ( "changed.txt", "old.txt" ):
+        ( tmp_path / name ).write_text( name * 20 + "\n" )
+    git( "add", ".", cwd = tmp_path )
+    git( "commit", "-q", "-m", "initial", cwd = tmp_path )
+    ( tmp_path / "changed.txt" ).write_text( "changed\n" )
+    git( "mv", "old.txt", "new.txt", cwd = tmp_path )
+    ( tmp_path / "untracked.txt" ).write_text( "" )
+    entries = status.get_status( settings = {}, cwd = tmp_path )
+    assert entries == [ status.Entry( "1", ".M", "changed.txt", None ),
+            status.Entry( "2", "R.", "new.txt", "old.txt" ),
+            status.Entry( "?", "??", "untracked.txt", None ) ]
+    groups = status.group( entries )
+    assert [ entry.path for entry in groups["staged"] ] == [ "new.txt" ]
+    assert [ entry.path for entry in groups["unstaged"] ] == [ "changed.txt" ]
+    assert [ entry.path for entry in groups["untracked"] ] == [ "untracked.txt" ]
+    assert status.get_status( [ "changed.txt" ], settings = {}, cwd = tmp_path ) == entries[:1]
+
+def test_status_command():
+    assert "core.untrackedCache=true" in status.status_command( settings = {} )
+    assert not "core.untrackedCache=true" in status.status_command( settings = { "status-untracked-cache": False } )
+    assert status.status_command( [ "a" ], settings = {} )[-2:] == [ "--", "a" ]
+
+def test_changed_pathspecs():
+    few = [ "a/x", "b/y" ]
+    assert status.changed_pathspecs( few ) == few
+    many = [ "dir" + str( i % 3 ) + "/file" + str( i ) for i in range( status.PATHSPEC_THRESHOLD + 1 ) ]
+    assert status.changed_pathspecs( many ) == [ "dir0", "dir1", "dir2" ]
+    assert status.changed_pathspecs( many + [ "top" ] ) is None
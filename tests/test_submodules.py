@@ -0,0 +1,58 @@
+#!/bin/env python3
+# Tests of the submodule update, with local bare remotes
+
+import os
+
+import submodules
+
+def commit( git, path, name ):
+    ( path / name ).write_text( name + "\n" )
+    git( "add", name, cwd = path )
+    git( "commit", "-q", "-m", name, cwd = path )
+    return git( "rev-parse", "HEAD", cwd = path )
+
+def setup( tmp_path, git ):
+    """Returns the seed repository (which pushes to the remote) and the submodules setting"""
+    seed = tmp_path / "seed"
+    git( "init", "-q", seed )
+    commit( git, seed, "first" )
+    git( "clone", "-q", "--bare", seed, tmp_path / "remote.git" )
+    git( "remote", "add", "origin", tmp_path / "remote.git", cwd = seed )
+    parent = tmp_path / "parent"
+    git( "init", "-q", parent )
+    git( "submodule", "add", "-q", "file://" + str( tmp_path / "remote.git" ), "module", cwd = parent )
+    git( "commit", "-q", "-m", "submodule", cwd = parent )
+    return seed, [ { str( parent / ".gitmodules" ): {} } ]
+
+def test_unchanged_remotes_are_skipped( tmp_path, git, capsys ):
+    seed, modules = setup( tmp_path, git )
+    # The tips are unknown at first, so the repository is pulled
+    assert [ ( path, returncode ) for path, returncode, duration in submodules.update_submodules( modules, 2 ) ] == [
+            ( str( tmp_path / "parent" ), 0 ) ]
+    capsys.readouterr()
+    assert submodules.update_submodules( modules, 2 ) == []
+    assert "1 of 1 repositories are up to date" in capsys.readouterr().out
+    # A new commit on the remote is pulled
+    tip = commit( git, seed, "second" )
+    git( "push", "-q", "origin", "master", cwd = seed )
+    assert len( submodules.update_submodules( modules, 2 ) ) == 1
+    assert git( "rev-parse", "HEAD", cwd = tmp_path / "parent" / "module" ) == tip
+    assert submodules.update_submodules( modules, 2 ) == []
+
+def test_force_pulls_unchanged_remotes( tmp_path, git ):
+    seed, modules = setup( tmp_path, git )
+    submodules.update_submodules( modules, 2 )
+    assert len( submodules.update_submodules( modules, 2, force = True ) ) == 1
+
+def test_failed_pulls_are_retried( tmp_path, git ):
+    seed, modules = setup( tmp_path, git )
+    submodules.update_submodules( modules, 2 )
+    commit( git, seed, "second" )
+    git( "push", "-q", "origin", "master", cwd = seed )
+    # The pull fails, because the submodule has a conflicting untracked file
+    ( tmp_path / "parent" / "module" / "second" ).write_text( "local\n" )
+    results = submodules.update_submodules( modules, 2 )
+    assert len( results ) == 1 and results[0][1] != 0
+    os.remove( tmp_path / "parent" / "module" / "second" )
+    results = submodules.update_submodules( modules, 2 )
+    assert len( results ) == 1 and results[0][1] == 0
@@ -0,0 +1,234 @@
+#!/bin/env python3
+# Watch
+
+import ctypes, ctypes.util, errno, os, select, struct, sys, time
+
+from cli_colors import fg, screen
+from repository import describe_head, find_repository
+from status import get_status, render
+
+# The inotify constants from <sys/inotify.h>
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_EXCL_UNLINK = 0x4000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+        IN_DELETE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK
+EVENT = struct.Struct( "iIII" )
+
+# The status must not write the index, otherwise every refresh would cause another event
+STATUS_ENV = { "GIT_OPTIONAL_LOCKS": "0" }
+
+# The files in the git directory, which change the status of all paths
+GIT_FILES = [ "index", "HEAD", "packed-refs", "MERGE_HEAD" ]
+
+# Events are collected until there was no event for the debounce interval ("watch-debounce"),
+# but the view is refreshed at least after MAX_DELAY seconds
+DEFAULT_DEBOUNCE = 0.1
+MAX_DELAY = 1.0
+# The interval of a full refresh, when inotify is not available ("watch-interval")
+DEFAULT_INTERVAL = 2.0
+
+class WatchLimit( Exception ):
+    pass
+
+class Inotify():
+    """A minimal inotify(7) binding via ctypes
+
+    Raises OSError, when inotify is not available and WatchLimit, when the limit of watches
+    (fs.inotify.max_user_watches) is reached.
+    """
+
+    def __init__( self ):
+        libc = ctypes.CDLL( ctypes.util.find_library( "c" ), use_errno = True )
+        if not hasattr( libc, "inotify_init1" ):
+            raise OSError( errno.ENOSYS, "inotify is not available" )
+        self.libc = libc
+        self.fd = libc.inotify_init1( IN_NONBLOCK | IN_CLOEXEC )
+        if self.fd < 0:
+            raise OSError( ctypes.get_errno(), os.strerror( ctypes.get_errno() ) )
+        # The paths of the watched directories, keyed on their watch descriptors
+        self.paths = {}
+
+    def add( self, path, mask = WATCH_MASK ):
+        wd = self.libc.inotify_add_watch( self.fd, os.fsencode( path ), mask )
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise WatchLimit( path )
+            # The directory was removed in the meantime
+            return None
+        self.paths[wd] = path
+        return wd
+
+    def read( self, timeout ):
+        """Returns a list of ( directory, name, mask ) tuples, waits up to timeout seconds for the first event"""
+        ready, _, _ = select.select( [ self.fd ], [], [], timeout )
+        if not ready:
+            return []
+        try:
+            data = os.read( self.fd, 1 << 16 )
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len( data ):
+            wd, mask, cookie, length = EVENT.unpack_from( data, offset )
+            name = os.fsdecode( data[offset + EVENT.size:offset + EVENT.size + length].rstrip( b"\0" ) )
+            offset += EVENT.size + length
+            if mask & IN_IGNORED:
+                self.paths.pop( wd, None )
+                continue
+            events.append( ( self.paths.get( wd ), name, mask ) )
+        return events
+
+    def close( self ):
+        os.close( self.fd )
+
+def directories( root ):
+    """Returns all directories of the working tree below root (without ".git")"""
+    result = []
+    for dirpath, dirnames, filenames in os.walk( root ):
+        dirnames[:] = [ name for name in dirnames if name != ".git" ]
+        result.append( dirpath )
+    return result
+
+class StatusView():
+    """The status of a repository, which is refreshed partially (only for the changed directories)"""
+
+    def __init__( self, repository ):
+        self.repository = repository
+        self.entries = []
+
+    def refresh( self, changed = None ):
+        """Refresh the status of the changed directories (relative to the working tree), or of all paths
+
+        The status of a directory includes all its subdirectories, so the entries below the
+        changed directories are replaced by the new status of these directories.
+        """
+        if changed is not None and "." in changed:
+            changed = None
+        if changed is None:
+            self.entries = get_status( cwd = self.repository.worktree, env = STATUS_ENV )
+            return
+        changed = sorted( changed )
+        # Only the outermost changed directories are needed
+        outermost = []
+        for directory in changed:
+            if not any( directory.startswith( parent + "/" ) for parent in outermost ):
+                outermost.append( directory )
+        def affected( path ):
+            return any( path == directory or path.startswith( directory + "/" ) for directory in outermost )
+        entries = [ entry for entry in self.entries if not affected( entry.path ) ]
+        self.entries = sorted( entries + get_status( outermost, cwd = self.repository.worktree, env = STATUS_ENV ),
+                key = lambda entry: entry.path )
+
+    def draw( self, mode ):
+        """Redraw the view in place"""
+        lines = [ fg.blue( describe_head( self.repository ) or "" ) + "  " + self.repository.worktree +
+                "  " + fg.yellow( mode ) + "  " + time.strftime( "%H:%M:%S" ) ]
+        lines += render( self.entries ) or [ fg.green( "Nothing to commit, working tree clean" ) ]
+        sys.stdout.write( screen.home() + "".join( line + screen.clear_line() + "\n" for line in lines ) + screen.clear() )
+        sys.stdout.flush()
+
+def watch_inotify( view, settings ):
+    """Refresh the view, when inotify reports changes in the working tree, the index, the HEAD or the refs"""
+    repository = view.repository
+    inotify = Inotify()
+    try:
+        for path in directories( repository.worktree ):
+            inotify.add( path )
+        inotify.add( repository.gitdir )
+        if repository.commondir != repository.gitdir:
+            inotify.add( repository.commondir )
+        for path in directories( os.path.join( repository.commondir, "refs" ) ):
+            inotify.add( path )
+        git_dirs = set( [ repository.gitdir, repository.commondir ] )
+        refs_dir = os.path.join( repository.commondir, "refs" )
+        debounce = settings.get( "watch-debounce" ) or DEFAULT_DEBOUNCE
+        view.draw( "inotify" )
+        while True:
+            events = inotify.read( None )
+            start = time.monotonic()
+            while time.monotonic() - start < MAX_DELAY:
+                more = inotify.read( debounce )
+                if not more:
+                    break
+                events += more
+            changed = set()
+            for directory, name, mask in events:
+                if mask & IN_Q_OVERFLOW:
+                    changed = None
+                    break
+                if directory is None:
+                    continue
+                if directory in git_dirs:
+                    if name in GIT_FILES:
+                        changed = None
+                        break
+                elif directory == refs_dir or directory.startswith( refs_dir + os.sep ):
+                    if mask & IN_ISDIR and mask & ( IN_CREATE | IN_MOVED_TO ):
+                        inotify.add( os.path.join( directory, name ) )
+                    changed = None
+                    break
+                else:
+                    if mask & IN_ISDIR and mask & ( IN_CREATE | IN_MOVED_TO ):
+                        # Watch the new directory (and the directories which were created in it so far)
+                        for path in directories( os.path.join( directory, name ) ):
+                            inotify.add( path )
+                    changed.add( os.path.relpath( directory, repository.worktree ).replace( os.sep, "/" ) )
+            if changed == set():
+                continue
+            view.refresh( changed )
+            view.draw( "inotify" )
+    finally:
+        inotify.close()
+
+def watch_polling( view, settings ):
+    """Refresh the complete view in an interval"""
+    interval = settings.get( "watch-interval" ) or DEFAULT_INTERVAL
+    while True:
+        view.draw( "polling every " + str( interval ) + "s" )
+        time.sleep( interval )
+        view.refresh()
+
+def watch_status( settings = None ):
+    """Show the status and redraw it in place, whenever the repository changes (i.e. "@index --watch")
+
+    The changes are reported by inotify on the working tree directories, the git directory
+    (the index and the HEAD) and the refs. Bursts of events are collected, until there was no
+    event for "watch-debounce" seconds, and only the status of the changed directories is
+    computed again. When inotify is not available or its limit of watches is reached, the
+    whole status is computed every "watch-interval" seconds.
+
+    Arguments:
+        settings: The settings dictionary
+    """
+    if settings is None:
+        from settings import get_settings
+        settings = get_settings()
+    repository = find_repository()
+    if not repository:
+        from messages import error
+        error( "You have not opened a repository" )
+    view = StatusView( repository )
+    view.refresh()
+    sys.stdout.write( screen.home() + screen.clear() )
+    try:
+        try:
+            watch_inotify( view, settings )
+        except ( OSError, WatchLimit ):
+            watch_polling( view, settings )
+    except KeyboardInterrupt:
+        print()